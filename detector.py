@@ -0,0 +1,93 @@
+"""Model resolution for the selectable CPU inference backends.
+
+``FAW_BACKEND`` picks ``pytorch``, ``onnx`` (ONNX Runtime) or ``openvino``. The
+exported artifacts are cached under ``model_cache/<weights sha256>/``, so they
+are rebuilt only when the weights file itself changes. ``int8`` loads the
+quantized ONNX model that ``quantize.py`` promoted for the same weights.
+"""
+import hashlib
+import logging
+import os
+import shutil
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('pytorch', 'onnx', 'openvino', 'int8')
+CACHE_DIR = os.environ.get('FAW_MODEL_CACHE', 'model_cache')
+
+
+def weights_hash(path):
+    """Return the SHA-256 of a weights file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_dir_for(weights):
+    """Return the cache directory for a weights file, keyed by its hash."""
+    return os.path.join(CACHE_DIR, weights_hash(weights)[:16])
+
+
+def quantized_artifact(weights):
+    """Return where the promoted INT8 model for these weights lives."""
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    return os.path.join(cache_dir_for(weights), f"{stem}_int8.onnx")
+
+
+def artifact_name(weights, backend):
+    """Return the file or directory name ultralytics gives an export of these weights."""
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    if backend == 'onnx':
+        return f"{stem}.onnx"
+    return f"{stem}_openvino_model"
+
+
+def export_model(weights, backend, imgsz=640):
+    """Export weights for a backend unless a cached artifact for the same weights exists."""
+    target_dir = cache_dir_for(weights)
+    digest = os.path.basename(target_dir)
+    artifact = os.path.join(target_dir, artifact_name(weights, backend))
+    if os.path.exists(artifact):
+        return artifact
+
+    # Export into a scratch directory and move it into place, so an interrupted
+    # export never leaves a half-written artifact that looks cached
+    scratch_dir = f"{target_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(scratch_dir, ignore_errors=True)
+    os.makedirs(scratch_dir)
+    source = os.path.join(scratch_dir, os.path.basename(weights))
+    shutil.copy2(weights, source)
+
+    logger.info(f"Exporting {weights} to {backend} (sha256 {digest})")
+    from ultralytics import YOLO
+    # Dynamic axes keep batched and tiled inference working on the exported model
+    YOLO(source).export(format=backend, imgsz=imgsz, dynamic=True)
+
+    os.makedirs(target_dir, exist_ok=True)
+    shutil.move(os.path.join(scratch_dir, artifact_name(weights, backend)), artifact)
+    shutil.rmtree(scratch_dir, ignore_errors=True)
+    return artifact
+
+
+def resolve_model(weights, backend='pytorch'):
+    """Return the model path to load for a backend, exporting it first if needed."""
+    backend = backend.lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {', '.join(BACKENDS)}")
+    if backend == 'pytorch':
+        return weights
+    if backend == 'int8':
+        artifact = quantized_artifact(weights)
+        if not os.path.exists(artifact):
+            raise FileNotFoundError(f"No promoted INT8 model for {weights}; run quantize.py first")
+        return artifact
+    return export_model(weights, backend)
+
+
+def load_model(path):
+    """Load a resolved model path; exported formats need the task spelled out."""
+    # ultralytics pulls in torch, so it is only imported once a model is actually needed
+    from ultralytics import YOLO
+    return YOLO(path, task='detect')
@@ -0,0 +1,281 @@
+"""Read GPS and camera metadata from JPEG headers without touching the image data.
+
+Usage:
+    python exif_gps.py bench uploads/survey
+    python exif_gps.py index uploads/survey --output survey_index.jsonl
+
+Only the APPn segments at the start of the file are read: the EXIF block in
+APP1 and, when present, the DJI XMP packet. Reading stops at the first
+segment that is not APPn or COM, which is always before the compressed scan
+data. ``bench`` compares speed and GPS agreement with exifread; ``index``
+writes one JSON line of metadata per image.
+"""
+import argparse
+import io
+import json
+import os
+import re
+import struct
+import sys
+import time
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg')
+
+EXIF_HEADER = b'Exif\x00\x00'
+XMP_HEADER = b'http://ns.adobe.com/xap/1.0/\x00'
+DJI_XMP_PATTERN = re.compile(rb'drone-dji:(RelativeAltitude|GimbalYawDegree)="([+-]?[0-9.]+)"')
+
+# Bytes per value for each TIFF field type
+TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8}
+
+TAG_ORIENTATION = 0x0112
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD = 0x8769
+TAG_GPS_IFD = 0x8825
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_FOCAL_LENGTH_35MM = 0xA405
+
+GPS_LATITUDE_REF = 0x01
+GPS_LATITUDE = 0x02
+GPS_LONGITUDE_REF = 0x03
+GPS_LONGITUDE = 0x04
+GPS_ALTITUDE_REF = 0x05
+GPS_ALTITUDE = 0x06
+GPS_IMG_DIRECTION = 0x11
+
+
+def header_segments(f):
+    """Yield (marker, payload) for the APP1 segments at the start of a JPEG file object.
+
+    Other leading segments are skipped with a seek, and iteration ends at the
+    first segment that cannot be metadata, so the scan data is never read.
+    """
+    if f.read(2) != b'\xff\xd8':
+        return
+    while True:
+        byte = f.read(1)
+        while byte == b'\xff':
+            byte = f.read(1)
+        if not byte:
+            return
+        marker = byte[0]
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            continue
+        if not (0xE0 <= marker <= 0xEF or marker == 0xFE):
+            return
+        length = f.read(2)
+        if len(length) < 2:
+            return
+        size = struct.unpack('>H', length)[0] - 2
+        if marker == 0xE1:
+            yield marker, f.read(size)
+        else:
+            f.seek(size, io.SEEK_CUR)
+        # Swallow the 0xFF that starts the next marker
+        if f.read(1) != b'\xff':
+            return
+
+
+class TiffReader:
+    """Read IFD entries from a TIFF block, with every offset bounds-checked."""
+
+    def __init__(self, data):
+        self.data = data
+        self.endian = '<' if data[:2] == b'II' else '>'
+
+    def unpack(self, fmt, offset):
+        fmt = self.endian + fmt
+        if offset < 0 or offset + struct.calcsize(fmt) > len(self.data):
+            raise ValueError("EXIF offset out of range")
+        return struct.unpack_from(fmt, self.data, offset)
+
+    def ifd(self, offset):
+        """Return {tag: value} for one IFD, values decoded by field type."""
+        entries = {}
+        count = self.unpack('H', offset)[0]
+        for i in range(count):
+            entry = offset + 2 + i * 12
+            tag, kind, n = self.unpack('HHI', entry)
+            size = TYPE_SIZES.get(kind)
+            if size is None:
+                continue
+            value_offset = entry + 8 if size * n <= 4 else self.unpack('I', entry + 8)[0]
+            try:
+                entries[tag] = self.value(kind, n, value_offset)
+            except ValueError:
+                continue
+        return entries
+
+    def value(self, kind, n, offset):
+        # Check the extent before building any format string from n, which comes from the file
+        if offset < 0 or offset + TYPE_SIZES[kind] * n > len(self.data):
+            raise ValueError("EXIF value out of range")
+        if kind == 2:
+            raw = self.data[offset:offset + n]
+            return raw.split(b'\x00', 1)[0].decode('ascii', 'replace').strip()
+        if kind in (5, 10):
+            fmt = 'I' if kind == 5 else 'i'
+            values = []
+            for i in range(n):
+                num, den = self.unpack(fmt * 2, offset + i * 8)
+                values.append(num / den if den else 0.0)
+        elif kind in (1, 7):
+            values = list(self.data[offset:offset + n])
+        else:
+            fmt = {3: 'H', 4: 'I', 6: 'b', 8: 'h', 9: 'i', 11: 'f', 12: 'd'}[kind]
+            values = list(self.unpack(fmt * n, offset))
+        return values[0] if n == 1 else values
+
+
+def is_number(value):
+    return isinstance(value, (int, float))
+
+
+def is_dms(value):
+    return isinstance(value, list) and len(value) == 3 and all(is_number(v) for v in value)
+
+
+def dms_to_decimal(dms, ref):
+    degrees = dms[0] + dms[1] / 60 + dms[2] / 3600
+    return -degrees if ref in ('S', 'W') else degrees
+
+
+def parse_exif(payload):
+    """Extract the fields we use from an APP1 EXIF payload (after the Exif header)."""
+    tiff = TiffReader(payload)
+    info = {}
+    ifd0 = tiff.ifd(tiff.unpack('I', 4)[0])
+    if isinstance(ifd0.get(TAG_ORIENTATION), int):
+        info['orientation'] = ifd0[TAG_ORIENTATION]
+
+    exif = tiff.ifd(ifd0[TAG_EXIF_IFD]) if isinstance(ifd0.get(TAG_EXIF_IFD), int) else {}
+    timestamp = exif.get(TAG_DATETIME_ORIGINAL) or ifd0.get(TAG_DATETIME)
+    if isinstance(timestamp, str) and len(timestamp) >= 19:
+        # EXIF writes 'YYYY:MM:DD HH:MM:SS'
+        info['timestamp'] = timestamp[:10].replace(':', '-') + 'T' + timestamp[11:]
+    if is_number(exif.get(TAG_FOCAL_LENGTH_35MM)) and exif[TAG_FOCAL_LENGTH_35MM]:
+        info['focal_length_35mm'] = exif[TAG_FOCAL_LENGTH_35MM]
+
+    gps = tiff.ifd(ifd0[TAG_GPS_IFD]) if isinstance(ifd0.get(TAG_GPS_IFD), int) else {}
+    if is_dms(gps.get(GPS_LATITUDE)) and is_dms(gps.get(GPS_LONGITUDE)):
+        info['lat'] = dms_to_decimal(gps[GPS_LATITUDE], gps.get(GPS_LATITUDE_REF, 'N'))
+        info['lon'] = dms_to_decimal(gps[GPS_LONGITUDE], gps.get(GPS_LONGITUDE_REF, 'E'))
+    if is_number(gps.get(GPS_ALTITUDE)):
+        # Reference 1 means below sea level
+        info['altitude'] = -gps[GPS_ALTITUDE] if gps.get(GPS_ALTITUDE_REF) == 1 else gps[GPS_ALTITUDE]
+    if is_number(gps.get(GPS_IMG_DIRECTION)):
+        info['img_direction'] = gps[GPS_IMG_DIRECTION]
+    return info
+
+
+def read_exif(source):
+    """Return GPS and camera metadata from a JPEG path, file object or bytes.
+
+    Keys are present only when the file has them: lat, lon, altitude (m above
+    sea level), timestamp, orientation, focal_length_35mm, img_direction, and
+    from DJI XMP relative_altitude (m above take-off) and gimbal_yaw.
+    Files that are not JPEGs or have broken headers give an empty dict.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return read_exif(f)
+
+    info = {}
+    seen_exif = False
+    try:
+        for _, payload in header_segments(source):
+            if payload.startswith(EXIF_HEADER) and not seen_exif:
+                seen_exif = True
+                info.update(parse_exif(payload[len(EXIF_HEADER):]))
+            elif payload.startswith(XMP_HEADER):
+                for key, value in DJI_XMP_PATTERN.findall(payload):
+                    info['relative_altitude' if key == b'RelativeAltitude' else 'gimbal_yaw'] = float(value)
+    except (ValueError, TypeError, AttributeError, struct.error, IndexError, KeyError):
+        pass
+    return info
+
+
+def list_images(folder):
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                  if name.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def bench(paths, repeat):
+    """Time read_exif against exifread on the same files and check they agree on GPS."""
+    import exifread
+
+    def exifread_gps(path):
+        with open(path, 'rb') as f:
+            tags = exifread.process_file(f, details=False)
+        if 'GPS GPSLatitude' not in tags or 'GPS GPSLongitude' not in tags:
+            return None
+        lat = [float(v) for v in tags['GPS GPSLatitude'].values]
+        lon = [float(v) for v in tags['GPS GPSLongitude'].values]
+        return (dms_to_decimal(lat, str(tags.get('GPS GPSLatitudeRef', 'N'))),
+                dms_to_decimal(lon, str(tags.get('GPS GPSLongitudeRef', 'E'))))
+
+    timings = {'exif_gps': 0.0, 'exifread': 0.0}
+    mismatches = 0
+    for path in paths:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            info = read_exif(path)
+        timings['exif_gps'] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            reference = exifread_gps(path)
+        timings['exifread'] += time.perf_counter() - started
+
+        ours = (info['lat'], info['lon']) if 'lat' in info else None
+        if (ours is None) != (reference is None) or (
+                ours and max(abs(a - b) for a, b in zip(ours, reference)) > 1e-7):
+            mismatches += 1
+            print(f"MISMATCH {os.path.basename(path)}: exif_gps {ours}, exifread {reference}")
+
+    runs = len(paths) * repeat
+    for name, seconds in timings.items():
+        print(f"{name:9s} {seconds / runs * 1000:8.3f} ms per file")
+    print(f"Speed-up {timings['exifread'] / max(timings['exif_gps'], 1e-9):.1f}x over {len(paths)} files, "
+          f"{mismatches} GPS mismatches.")
+    return 1 if mismatches else 0
+
+
+def index(paths, output):
+    """Write one JSON line per image with its name, size on disk and header metadata."""
+    out = open(output, 'w') if output else sys.stdout
+    try:
+        for path in paths:
+            record = {'image_name': os.path.basename(path), 'bytes': os.path.getsize(path)}
+            record.update(read_exif(path))
+            out.write(json.dumps(record) + '\n')
+    finally:
+        if output:
+            out.close()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Header-only EXIF/GPS reader for survey images.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    bench_parser = commands.add_parser('bench', help="Compare speed and GPS output with exifread")
+    bench_parser.add_argument('folder', help="Folder of JPEG images")
+    bench_parser.add_argument('--repeat', type=int, default=5, help="Reads per file for each reader")
+    index_parser = commands.add_parser('index', help="Write GPS metadata for every image as JSON lines")
+    index_parser.add_argument('folder', help="Folder of JPEG images")
+    index_parser.add_argument('--output', help="File to write (defaults to stdout)")
+    args = parser.parse_args()
+
+    paths = list_images(args.folder)
+    if not paths:
+        print(f"No JPEG images found in {args.folder}")
+        return 1
+    if args.command == 'bench':
+        return bench(paths, args.repeat)
+    return index(paths, args.output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""Process pool that runs YOLO inference outside the Flask interpreter.
+
+Workers are forked as soon as the pool is created, which should happen before
+the parent starts any other thread, and load the weights once ``load()`` sends
+the resolved path. Decoded frames are handed over
+through fixed-size slots in a single shared-memory block, so only slot indices
+and shapes cross the process boundary. Workers send back the raw box tensors and
+the parent rebuilds ultralytics ``Results`` around its own copy of the frame, so
+callers see exactly what an in-process ``model(...)`` call would return.
+"""
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image
+
+from detector import load_model
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_main(shm, slot_bytes, weights_queue, tasks, results, num_threads):
+    """Wait for the weights path, load the model once and serve batches until a ``None`` task arrives."""
+    weights = weights_queue.get()
+    if weights is None:
+        return
+    try:
+        import torch
+        torch.set_num_threads(num_threads)
+        model = load_model(weights)
+    except Exception as e:
+        # Tell the parent at once instead of letting it wait out the timeout
+        results.put(('failed', os.getpid(), repr(e)))
+        return
+    results.put(('ready', os.getpid(), model.names))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, frames, kwargs = task
+        try:
+            images = []
+            for frame in frames:
+                if isinstance(frame, np.ndarray):
+                    # Frame did not fit a free slot and was sent pickled
+                    images.append(frame)
+                else:
+                    slot, shape, dtype = frame
+                    images.append(np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=slot * slot_bytes))
+            output = model(images, **kwargs)
+            payload = [(result.boxes.data.cpu().numpy(), result.speed) for result in output]
+            results.put((task_id, payload, None))
+        except Exception as e:
+            results.put((task_id, None, repr(e)))
+
+
+def to_bgr_array(img):
+    """Return a contiguous BGR uint8 array for a PIL image or an OpenCV frame."""
+    if isinstance(img, Image.Image):
+        img = np.asarray(img.convert('RGB'))[:, :, ::-1]
+    return np.ascontiguousarray(img)
+
+
+class InferencePool:
+    """Fan inference batches out to worker processes that share a frame ring buffer."""
+
+    def __init__(self, workers, slots=None, slot_mb=8, threads_per_worker=None, timeout=60):
+        # Workers are forked so they inherit the shared-memory mapping directly;
+        # spawning would re-import server.py (and load the model) in every child.
+        # Forking is only safe while the parent has no other threads holding locks,
+        # so the workers start here and receive the weights later through load().
+        ctx = mp.get_context('fork')
+
+        self.workers = workers
+        self.timeout = timeout
+        self.slot_bytes = int(slot_mb * 1024 * 1024)
+        self.num_slots = slots or workers * 4
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * self.num_slots)
+        self.free_slots = queue.Queue()
+        for slot in range(self.num_slots):
+            self.free_slots.put(slot)
+
+        self.weights = ctx.Queue()
+        self.tasks = ctx.Queue()
+        self.results = ctx.Queue()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.task_ids = itertools.count()
+        self.names = None
+        self.ready = threading.Event()
+        self.ready_workers = 0
+        self.load_errors = []
+        self.pickled_frames = 0
+
+        threads = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        self.processes = [
+            ctx.Process(target=_worker_main,
+                        args=(self.shm, self.slot_bytes, self.weights, self.tasks, self.results, threads),
+                        daemon=True)
+            for _ in range(workers)
+        ]
+        for process in self.processes:
+            process.start()
+
+        self.listener = threading.Thread(target=self._collect, daemon=True)
+        self.listener.start()
+        logger.info(f"Started {workers} inference workers with {self.num_slots} frame slots "
+                    f"of {slot_mb} MB and {threads} threads each")
+
+    def load(self, weights):
+        """Send every worker the resolved weights path; ``ready`` is set once the first one has loaded."""
+        for _ in self.processes:
+            self.weights.put(weights)
+
+    def wait_ready(self, timeout=None):
+        """Block until a worker has loaded the model; raises RuntimeError if none did in time."""
+        self.ready.wait(timeout)
+        with self.lock:
+            if self.ready_workers:
+                return
+            if len(self.load_errors) == self.workers:
+                raise RuntimeError(f"Every inference worker failed to load the model: {self.load_errors[0]}")
+        raise RuntimeError(f"No inference worker loaded the model within {timeout}s")
+
+    def submit(self, images, **kwargs):
+        """Copy frames into free slots and queue them as one batch; returns a Future."""
+        images = [to_bgr_array(img) for img in images]
+        frames = []
+        slots = []
+        for img in images:
+            try:
+                if img.nbytes > self.slot_bytes:
+                    raise queue.Empty
+                slot = self.free_slots.get_nowait()
+            except queue.Empty:
+                # Never block on the ring: oversized frames or a full ring fall back to pickling
+                frames.append(img)
+                with self.lock:
+                    self.pickled_frames += 1
+                continue
+            view = np.ndarray(img.shape, dtype=img.dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+            view[...] = img
+            frames.append((slot, img.shape, img.dtype.str))
+            slots.append(slot)
+
+        future = Future()
+        task_id = next(self.task_ids)
+        with self.lock:
+            self.pending[task_id] = (future, images, slots)
+        self.tasks.put((task_id, frames, kwargs))
+        return future
+
+    def infer(self, images, **kwargs):
+        """Run a batch on the pool and block until its Results are ready."""
+        return self.submit(images, **kwargs).result(self.timeout)
+
+    def _collect(self):
+        # Imported here so importing this module stays cheap for the server's start-up
+        import torch
+        from ultralytics.engine.results import Results
+
+        while True:
+            try:
+                message = self.results.get()
+            except (EOFError, OSError):
+                break
+
+            if message[0] == 'ready':
+                with self.lock:
+                    self.names = message[2]
+                    self.ready_workers += 1
+                self.ready.set()
+                continue
+            if message[0] == 'failed':
+                logger.error(f"Inference worker {message[1]} failed to load the model: {message[2]}")
+                with self.lock:
+                    self.load_errors.append(message[2])
+                    if len(self.load_errors) == self.workers:
+                        # Nobody will become ready; wake wait_ready() now
+                        self.ready.set()
+                continue
+
+            task_id, payload, error = message
+            with self.lock:
+                future, images, slots = self.pending.pop(task_id)
+            for slot in slots:
+                self.free_slots.put(slot)
+
+            if error:
+                future.set_exception(RuntimeError(f"Inference worker failed: {error}"))
+                continue
+
+            output = []
+            for img, (data, speed) in zip(images, payload):
+                result = Results(img, path='', names=self.names, boxes=torch.from_numpy(data))
+                result.speed = speed
+                output.append(result)
+            future.set_result(output)
+
+    def stats(self):
+        """Return worker, slot and backlog counters."""
+        with self.lock:
+            return {
+                'workers': self.workers,
+                'ready_workers': self.ready_workers,
+                'failed_workers': len(self.load_errors),
+                'alive_workers': sum(process.is_alive() for process in self.processes),
+                'slots': self.num_slots,
+                'free_slots': self.free_slots.qsize(),
+                'pending_batches': len(self.pending),
+                'pickled_frames': self.pickled_frames
+            }
+
+    def close(self):
+        """Stop the workers and release the shared-memory block."""
+        for _ in self.processes:
+            # Workers still waiting for weights stop on the first None, loaded ones on the second
+            self.weights.put(None)
+            self.tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
+        self.shm.close()
+        self.shm.unlink()
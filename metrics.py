@@ -0,0 +1,64 @@
+"""Prometheus metrics for the detection server, exposed on ``/metrics``.
+
+Stage latencies share one histogram labelled by stage, so a dashboard can
+stack decode, model preprocess/forward/postprocess, annotation, JPEG encode,
+database writes and Socket.IO emits side by side. Queue depths are read
+lazily at scrape time, so they add nothing to the request path.
+"""
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# 0.5 ms to 10 s: single-frame stages sit at the low end, tiled stills and DB flushes at the top
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_SECONDS = Histogram('faw_stage_seconds', "Time spent in each processing stage",
+                          ['stage'], buckets=STAGE_BUCKETS)
+REQUESTS = Counter('faw_http_requests', "HTTP requests by endpoint, method and status code",
+                   ['endpoint', 'method', 'status'])
+REQUEST_SECONDS = Histogram('faw_http_request_seconds', "Time to build an HTTP response, by endpoint",
+                            ['endpoint'], buckets=STAGE_BUCKETS)
+FRAMES = Counter('faw_stream_frames', "Live stream frames by outcome: published, replaced before "
+                 "sending, sent, or skipped for a client that had not acked", ['outcome'])
+QUEUE_DEPTH = Gauge('faw_queue_depth', "Items waiting in each internal queue", ['queue'])
+
+# ultralytics reports its own split of a model call; 'inference' is the forward pass
+SPEED_STAGES = {'preprocess': 'preprocess', 'inference': 'forward', 'postprocess': 'postprocess'}
+
+# /api/detect pipeline timing keys and the stage each one is reported as
+TIMING_STAGES = {
+    'read_ms': 'read',
+    'exif_ms': 'exif',
+    'decode_ms': 'decode',
+    'model_preprocess_ms': 'preprocess',
+    'model_inference_ms': 'forward',
+    'model_postprocess_ms': 'postprocess',
+    'annotate_ms': 'annotate',
+    'encode_ms': 'encode'
+}
+
+
+def observe_stage(stage, seconds):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def observe_speed(speed):
+    """Record an ultralytics ``Results.speed`` dict (milliseconds per image)."""
+    for key, value in (speed or {}).items():
+        if value is not None and key in SPEED_STAGES:
+            STAGE_SECONDS.labels(SPEED_STAGES[key]).observe(value / 1000)
+
+
+def observe_timings(timings):
+    """Record the per-image timings of an /api/detect pipeline entry."""
+    for key, value in timings.items():
+        if key in TIMING_STAGES:
+            STAGE_SECONDS.labels(TIMING_STAGES[key]).observe(value / 1000)
+
+
+def track_queue(name, depth):
+    """Report depth() as the queue's size whenever metrics are scraped."""
+    QUEUE_DEPTH.labels(name).set_function(depth)
+
+
+def render():
+    """Return the metrics page body and its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,92 @@
+"""Compare detector output across backends on a folder of sample images.
+
+Usage:
+    python parity_check.py samples/ --backends pytorch onnx openvino
+
+The first backend is the reference. Every other backend must find the same
+number of boxes per image, with matching classes, box corners within
+--box-tol pixels and confidences within --conf-tol. The exit status is 1
+when any image falls outside those tolerances.
+"""
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from detector import load_model, resolve_model
+
+# INT8 is gated by quantize.py's accuracy check rather than exact parity
+BACKENDS = ('pytorch', 'onnx', 'openvino')
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def iou(a, b):
+    """Intersection over union of two xyxy boxes."""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def compare(reference, candidate):
+    """Greedily pair boxes by IoU and return the worst box, confidence and class differences."""
+    worst_box = 0.0
+    worst_conf = 0.0
+    class_mismatches = 0
+    unmatched = list(range(len(candidate)))
+    for ref in reference:
+        if not unmatched:
+            break
+        best = max(unmatched, key=lambda j: iou(ref[:4], candidate[j][:4]))
+        unmatched.remove(best)
+        match = candidate[best]
+        worst_box = max(worst_box, float(np.abs(ref[:4] - match[:4]).max()))
+        worst_conf = max(worst_conf, abs(float(ref[4] - match[4])))
+        class_mismatches += int(ref[5] != match[5])
+    return worst_box, worst_conf, class_mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that detector backends agree on sample images.")
+    parser.add_argument('samples', help="Folder of sample images")
+    parser.add_argument('--weights', default='best.pt')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument('--box-tol', type=float, default=2.0, help="Max box corner difference in pixels")
+    parser.add_argument('--conf-tol', type=float, default=0.02, help="Max confidence difference")
+    args = parser.parse_args()
+
+    paths = sorted(os.path.join(args.samples, name) for name in os.listdir(args.samples)
+                   if name.lower().endswith(IMAGE_EXTENSIONS))
+    if not paths:
+        print(f"No images found in {args.samples}")
+        return 1
+
+    models = {backend: load_model(resolve_model(args.weights, backend)) for backend in args.backends}
+    reference_backend = args.backends[0]
+    failures = 0
+
+    for path in paths:
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        outputs = {backend: m(img, imgsz=640, conf=0.5, iou=0.5, verbose=False)[0].boxes.data.cpu().numpy()
+                   for backend, m in models.items()}
+        reference = outputs[reference_backend]
+        for backend in args.backends[1:]:
+            candidate = outputs[backend]
+            worst_box, worst_conf, class_mismatches = compare(reference, candidate)
+            ok = (len(candidate) == len(reference) and class_mismatches == 0
+                  and worst_box <= args.box_tol and worst_conf <= args.conf_tol)
+            failures += not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {os.path.basename(path)} {backend}: "
+                  f"boxes {len(candidate)}/{len(reference)}, max box diff {worst_box:.2f}px, "
+                  f"max conf diff {worst_conf:.4f}, class mismatches {class_mismatches}")
+
+    print(f"{len(paths)} images checked, {failures} backend comparisons outside tolerance.")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""Build an INT8 version of best.pt and promote it only if it stays accurate.
+
+Usage:
+    python quantize.py uploads/calibration --weights best.pt --val-dir uploads/validation
+
+The FP32 ONNX export is statically quantized with ONNX Runtime, calibrated on the
+given image folder. The INT8 model is then compared with the FP32 model on the
+validation images (the calibration images when --val-dir is omitted). FP32
+detections serve as ground truth for mAP@0.5, and the infested / not-infested
+counts of the two models are compared at the serving thresholds. The model is
+promoted to the path the server loads with FAW_BACKEND=int8 only when both
+stay within the limits.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+
+import cv2
+import numpy as np
+import onnx
+import onnxruntime as ort
+from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+from detector import export_model, load_model, quantized_artifact
+from parity_check import IMAGE_EXTENSIONS, iou
+
+
+def letterbox(path, imgsz=640):
+    """Load an image and letterbox it into the NCHW float tensor the exported model expects."""
+    img = cv2.imread(path, cv2.IMREAD_COLOR)
+    h, w = img.shape[:2]
+    r = imgsz / max(h, w)
+    resized = cv2.resize(img, (round(w * r), round(h * r)), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((imgsz, imgsz, 3), 114, np.uint8)
+    top = (imgsz - resized.shape[0]) // 2
+    left = (imgsz - resized.shape[1]) // 2
+    canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    blob = canvas[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+    return np.ascontiguousarray(blob)
+
+
+class ImageFolderReader(CalibrationDataReader):
+    """Feed calibration images to ONNX Runtime one at a time."""
+
+    def __init__(self, paths, input_name, imgsz=640):
+        self.paths = iter(paths)
+        self.input_name = input_name
+        self.imgsz = imgsz
+
+    def get_next(self):
+        path = next(self.paths, None)
+        if path is None:
+            return None
+        return {self.input_name: letterbox(path, self.imgsz)}
+
+
+def list_images(folder):
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                  if name.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def predict(model, paths, conf):
+    return [model(cv2.imread(path, cv2.IMREAD_COLOR), imgsz=640, conf=conf, iou=0.5,
+                  verbose=False)[0].boxes.data.cpu().numpy() for path in paths]
+
+
+def mean_average_precision(predictions, references, iou_thr=0.5):
+    """mAP@iou_thr of predictions against reference boxes, both as per-image (N, 6) arrays."""
+    classes = sorted({int(c) for ref in references for c in ref[:, 5]})
+    aps = []
+    for cls in classes:
+        scored = []
+        total_refs = 0
+        for preds, refs in zip(predictions, references):
+            refs = refs[refs[:, 5] == cls]
+            preds = preds[preds[:, 5] == cls]
+            total_refs += len(refs)
+            unmatched = list(range(len(refs)))
+            for det in preds[np.argsort(-preds[:, 4])]:
+                best = max(unmatched, key=lambda j: iou(det[:4], refs[j][:4]), default=None)
+                hit = best is not None and iou(det[:4], refs[best][:4]) >= iou_thr
+                if hit:
+                    unmatched.remove(best)
+                scored.append((float(det[4]), hit))
+
+        scored.sort(key=lambda item: -item[0])
+        hits = np.array([hit for _, hit in scored], dtype=float)
+        tp = np.cumsum(hits)
+        fp = np.cumsum(1 - hits)
+        recall = np.concatenate(([0.0], tp / total_refs, [1.0]))
+        precision = np.concatenate(([1.0], tp / np.maximum(tp + fp, 1e-9), [0.0]))
+        # All-point interpolation: make precision monotonically decreasing, then integrate
+        precision = np.flip(np.maximum.accumulate(np.flip(precision)))
+        steps = np.where(recall[1:] != recall[:-1])[0]
+        aps.append(float(np.sum((recall[steps + 1] - recall[steps]) * precision[steps + 1])))
+    return float(np.mean(aps)) if aps else 1.0
+
+
+def class_counts(predictions):
+    infested = sum(int((p[:, 5] == 0).sum()) for p in predictions)
+    not_infested = sum(int((p[:, 5] != 0).sum()) for p in predictions)
+    return {'infested': infested, 'not_infested': not_infested}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize best.pt to INT8 behind an accuracy gate.")
+    parser.add_argument('calibration', help="Folder of calibration images, e.g. past /api/detect uploads")
+    parser.add_argument('--weights', default='best.pt')
+    parser.add_argument('--val-dir', help="Folder of validation images (defaults to the calibration folder)")
+    parser.add_argument('--max-map-drop', type=float, default=0.03,
+                        help="Largest allowed drop below mAP@0.5 = 1.0 against the FP32 model")
+    parser.add_argument('--max-count-drift', type=float, default=0.05,
+                        help="Largest allowed relative change in infested / not-infested counts")
+    args = parser.parse_args()
+
+    calibration = list_images(args.calibration)
+    validation = list_images(args.val_dir) if args.val_dir else calibration
+    if not calibration or not validation:
+        print("Calibration and validation folders must contain images.")
+        return 1
+
+    fp32_path = export_model(args.weights, 'onnx')
+    promoted_path = quantized_artifact(args.weights)
+    candidate_path = promoted_path.replace('.onnx', '.candidate.onnx')
+
+    print(f"Calibrating on {len(calibration)} images...")
+    input_name = ort.InferenceSession(fp32_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+    quantize_static(fp32_path, candidate_path, ImageFolderReader(calibration, input_name),
+                    quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8, per_channel=True)
+
+    # Carry over the ultralytics metadata (class names, stride, imgsz) so the INT8 model loads the same way
+    fp32_onnx = onnx.load(fp32_path)
+    int8_onnx = onnx.load(candidate_path)
+    del int8_onnx.metadata_props[:]
+    int8_onnx.metadata_props.extend(fp32_onnx.metadata_props)
+    onnx.save(int8_onnx, candidate_path)
+
+    print(f"Evaluating on {len(validation)} images...")
+    fp32_model = load_model(fp32_path)
+    int8_model = load_model(candidate_path)
+    references = predict(fp32_model, validation, conf=0.5)
+    int8_map = mean_average_precision(predict(int8_model, validation, conf=0.001), references)
+
+    fp32_counts = class_counts(references)
+    int8_counts = class_counts(predict(int8_model, validation, conf=0.5))
+    drift = {name: abs(int8_counts[name] - fp32_counts[name]) / max(fp32_counts[name], 1)
+             for name in fp32_counts}
+
+    report = {
+        'weights': args.weights,
+        'calibration_images': len(calibration),
+        'validation_images': len(validation),
+        'map50_vs_fp32': round(int8_map, 4),
+        'fp32_counts': fp32_counts,
+        'int8_counts': int8_counts,
+        'count_drift': {name: round(value, 4) for name, value in drift.items()},
+        'max_map_drop': args.max_map_drop,
+        'max_count_drift': args.max_count_drift
+    }
+    passed = int8_map >= 1.0 - args.max_map_drop and max(drift.values()) <= args.max_count_drift
+    report['promoted'] = passed
+    with open(candidate_path.replace('.onnx', '.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report, indent=2))
+    if not passed:
+        print(f"INT8 model NOT promoted; candidate left at {candidate_path}")
+        return 1
+
+    shutil.move(candidate_path, promoted_path)
+    print(f"INT8 model promoted to {promoted_path}; start the server with FAW_BACKEND=int8 to use it.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,5 @@
-from flask import Flask, request, jsonify
-from flask_socketio import SocketIO
-from ultralytics import YOLO
+from flask import Flask, Response, g, request, jsonify, send_file, stream_with_context
+from flask_socketio import SocketIO, join_room, leave_room
 import cv2
 import numpy as np
 import time
@@ -8,13 +7,27 @@ import threading
 from datetime import datetime
 import sqlite3
 import base64
+import json
 import hashlib
-import exifread
 import io
+import atexit
+import itertools
 import logging
+import math
+import os
+import re
+import shutil
+import uuid
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing, contextmanager
 from flask_cors import CORS
 from PIL import Image, ImageDraw, ImageFont
-from queue import Queue
+from queue import Queue, Empty, Full
+from inference_pool import InferencePool, to_bgr_array
+from detector import load_model, resolve_model, weights_hash
+from exif_gps import read_exif
+import metrics
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -29,22 +42,508 @@ socketio = SocketIO(app,
                     logger=True,
                     engineio_logger=True)
 
-# Load YOLOv8 model
-try:
-    model = YOLO("best.pt")
-except Exception as e:
-    print(f"Error loading YOLO model: {e}")
-    exit(1)
+# Inference backend: pytorch, onnx (ONNX Runtime) or openvino
+MODEL_BACKEND = os.environ.get('FAW_BACKEND', 'pytorch')
 
-# Global buffer to store video frames (base64 strings)
-frame_buffer = Queue(maxsize=10)
+# Optional pool of inference worker processes (0 keeps inference in this process)
+INFERENCE_WORKERS = int(os.environ.get('FAW_INFERENCE_WORKERS', 0))
+POOL_SLOTS = int(os.environ.get('FAW_POOL_SLOTS', 0)) or None
+POOL_SLOT_MB = float(os.environ.get('FAW_POOL_SLOT_MB', 8))
+WORKER_THREADS = int(os.environ.get('FAW_WORKER_THREADS', 0)) or None
+
+# Fork the inference workers now, while this process has no other threads: a fork
+# taken while another thread holds a lock can deadlock the child. load_models()
+# sends them the weights once they are resolved.
+worker_pool = None
+if INFERENCE_WORKERS > 0:
+    try:
+        worker_pool = InferencePool(INFERENCE_WORKERS, slots=POOL_SLOTS, slot_mb=POOL_SLOT_MB,
+                                    threads_per_worker=WORKER_THREADS)
+        atexit.register(worker_pool.close)
+    except ValueError as e:
+        logger.warning(f"Inference pool unavailable on this platform, using in-process model: {e}")
+
+# Set by load_models() on a background thread, so the server answers before the model is in memory
+model = None
+model_path = None
+MODEL_VERSION = None
+inference_pool = None
+inference_scheduler = None
+font = None
+model_ready = threading.Event()
+startup_state = {
+    'status': 'loading',
+    'stage': None,
+    'error': None,
+    'started_at': time.time(),
+    'ready_at': None,
+    'timings': {}
+}
+
+# Live stream frames: raw annotated JPEG bytes plus a small header
+frame_ids = itertools.count(1)
+FRAME_MODES = ('base64', 'binary')
+FRAME_ACK_TIMEOUT = float(os.environ.get('FAW_FRAME_ACK_TIMEOUT', 2.0))
+
+class FrameBroadcaster:
+    """Push the newest annotated frame of each source to stream clients as soon as it exists.
+
+    Only the latest unsent frame per source is kept, so a burst replaces older
+    frames instead of queueing them. Clients that acknowledge frames have at most
+    one frame in flight; while a slow client has not acked, newer frames skip it
+    instead of piling up in its socket buffer.
+    """
+
+    def __init__(self, ack_timeout):
+        self.ack_timeout = ack_timeout
+        self.condition = threading.Condition()
+        self.pending = {}
+        self.clients = {}
+        self.published = 0
+        self.replaced = 0
+
+    def publish(self, frame_data):
+        with self.condition:
+            if frame_data['source'] in self.pending:
+                self.replaced += 1
+                metrics.FRAMES.labels('replaced').inc()
+            self.pending[frame_data['source']] = frame_data
+            self.published += 1
+            self.condition.notify()
+        metrics.FRAMES.labels('published').inc()
+
+    def add_client(self, sid):
+        # Clients start on the legacy base64 event until they negotiate otherwise
+        with self.condition:
+            self.clients[sid] = {'mode': 'base64', 'ack': False, 'in_flight': None, 'sent': 0, 'skipped': 0}
+
+    def remove_client(self, sid):
+        with self.condition:
+            self.clients.pop(sid, None)
+
+    def has_clients(self):
+        with self.condition:
+            return bool(self.clients)
+
+    def set_mode(self, sid, mode, ack):
+        with self.condition:
+            state = self.clients.setdefault(sid, {'in_flight': None, 'sent': 0, 'skipped': 0})
+            state['mode'] = mode
+            state['ack'] = ack
+            state['in_flight'] = None
+
+    def run(self):
+        while True:
+            # Sleep until a frame is published; nothing wakes up while no camera is active
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                frames = list(self.pending.values())
+                self.pending.clear()
+                clients = list(self.clients.items())
+            for frame_data in frames:
+                try:
+                    self._send(frame_data, clients)
+                except Exception as e:
+                    logger.error(f"Error in frame streaming: {e}")
+
+    def _send(self, frame_data, clients):
+        header = {key: value for key, value in frame_data.items() if key != 'jpeg'}
+        encoded = None
+        now = time.time()
+        for sid, state in clients:
+            with self.condition:
+                if state['in_flight'] is not None and now - state['in_flight'] < self.ack_timeout:
+                    state['skipped'] += 1
+                    metrics.FRAMES.labels('skipped').inc()
+                    continue
+                state['sent'] += 1
+                if state['ack']:
+                    state['in_flight'] = now
+            callback = (lambda *args, sid=sid: self._acked(sid)) if state['ack'] else None
+            started = time.perf_counter()
+            if state['mode'] == 'binary':
+                socketio.emit('video_frame_binary', (header, frame_data['jpeg']), to=sid, callback=callback)
+            else:
+                if encoded is None:
+                    encoded = base64.b64encode(frame_data['jpeg']).decode('utf-8')
+                socketio.emit('video_frame', {"image": encoded}, to=sid, callback=callback)
+            metrics.observe_stage('emit', time.perf_counter() - started)
+            metrics.FRAMES.labels('sent').inc()
+
+    def _acked(self, sid):
+        with self.condition:
+            state = self.clients.get(sid)
+            if state is not None:
+                state['in_flight'] = None
+
+    def stats(self):
+        with self.condition:
+            return {
+                'published': self.published,
+                'replaced': self.replaced,
+                'pending_sources': len(self.pending),
+                'clients': [
+                    {'mode': state['mode'], 'ack': state['ack'], 'sent': state['sent'], 'skipped': state['skipped']}
+                    for state in self.clients.values()
+                ]
+            }
+
+frame_broadcaster = FrameBroadcaster(FRAME_ACK_TIMEOUT)
+
+# Unique plant counts since the last reset: a tracked plant is counted once,
+# as infested if it was ever seen infested
 detection_counts = {
     "infested": 0,
     "not_infested": 0
 }
+counts_lock = threading.Lock()
+
+# Per-source plant tracking for /detect
+TRACK_IOU_THRESHOLD = float(os.environ.get('FAW_TRACK_IOU', 0.3))
+TRACK_MAX_AGE = float(os.environ.get('FAW_TRACK_MAX_AGE', 3.0))
+TRACK_MIN_HITS = int(os.environ.get('FAW_TRACK_MIN_HITS', 1))
+track_ids = itertools.count(1)
+
+def box_iou(a, b):
+    """IoU of two normalized (x_center, y_center, width, height) boxes."""
+    ax1, ay1, ax2, ay2 = a[0] - a[2] / 2, a[1] - a[3] / 2, a[0] + a[2] / 2, a[1] + a[3] / 2
+    bx1, by1, bx2, by2 = b[0] - b[2] / 2, b[1] - b[3] / 2, b[0] + b[2] / 2, b[1] + b[3] / 2
+    inter = max(0.0, min(ax2, bx2) - max(ax1, bx1)) * max(0.0, min(ay2, by2) - max(ay1, by1))
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+class PlantTracker:
+    """SORT-style tracker for one video source.
+
+    Tracks move with a constant-velocity estimate between frames and are matched
+    to new boxes greedily by IoU. A track is counted once it has min_hits
+    matches and is dropped after max_age seconds without one.
+    """
+
+    def __init__(self, iou_threshold, max_age, min_hits):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.tracks = []
+        self.last_update = time.time()
+
+    def update(self, boxes, classes, now):
+        """Assign a track id to every box; returns (ids, newly counted tracks, tracks that turned infested)."""
+        self.last_update = now
+        self.tracks = [track for track in self.tracks if now - track['last_seen'] <= self.max_age]
+        predicted = []
+        for track in self.tracks:
+            dt = now - track['last_seen']
+            x, y, w, h = track['box']
+            predicted.append((x + track['velocity'][0] * dt, y + track['velocity'][1] * dt, w, h))
+
+        pairs = sorted(((box_iou(p, box), t, d) for t, p in enumerate(predicted) for d, box in enumerate(boxes)),
+                       reverse=True)
+        matches = {}
+        used_tracks = set()
+        for overlap, t, d in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if t in used_tracks or d in matches:
+                continue
+            matches[d] = t
+            used_tracks.add(t)
+
+        ids = []
+        counted = []
+        turned_infested = []
+        for d, (box, cls) in enumerate(zip(boxes, classes)):
+            if d in matches:
+                track = self.tracks[matches[d]]
+                dt = max(now - track['last_seen'], 1e-3)
+                # Smooth the velocity so one jittery box does not throw the prediction off
+                track['velocity'] = tuple(0.5 * v + 0.5 * (box[i] - track['box'][i]) / dt
+                                          for i, v in enumerate(track['velocity']))
+                track['box'] = box
+                track['last_seen'] = now
+                track['hits'] += 1
+            else:
+                track = {'id': next(track_ids), 'box': box, 'velocity': (0.0, 0.0), 'last_seen': now,
+                         'hits': 1, 'infested': False, 'counted': False}
+                self.tracks.append(track)
+
+            if cls == 0 and not track['infested']:  # Assuming 0 is infested
+                track['infested'] = True
+                if track['counted']:
+                    turned_infested.append(track)
+            if not track['counted'] and track['hits'] >= self.min_hits:
+                track['counted'] = True
+                counted.append(track)
+            ids.append(track['id'])
+        return ids, counted, turned_infested
+
+    def touch(self, ids, now):
+        """Keep tracks alive for a frame whose detections were served from the scene gate."""
+        self.last_update = now
+        ids = set(ids)
+        for track in self.tracks:
+            if track['id'] in ids:
+                track['last_seen'] = now
+
+trackers = {}
+
+def update_tracks(source, boxes, classes):
+    """Track this frame's boxes and fold newly seen plants into the global counts."""
+    now = time.time()
+    with counts_lock:
+        # Forget sources that have gone quiet
+        for key in [key for key, tracker in trackers.items() if now - tracker.last_update > 60 * TRACK_MAX_AGE]:
+            del trackers[key]
+        tracker = trackers.setdefault(source, PlantTracker(TRACK_IOU_THRESHOLD, TRACK_MAX_AGE, TRACK_MIN_HITS))
+        ids, counted, turned_infested = tracker.update(boxes, classes, now)
+        for track in counted:
+            detection_counts["infested" if track['infested'] else "not_infested"] += 1
+        for track in turned_infested:
+            detection_counts["not_infested"] -= 1
+            detection_counts["infested"] += 1
+    return ids, counted
+
+# The in-process model is not thread-safe, so local calls are serialized
+model_lock = threading.Lock()
+
+def run_model(images, **kwargs):
+    """Run a batch of images on the worker pool when enabled, else on the in-process model."""
+    if inference_pool is not None:
+        return inference_pool.infer(images, **kwargs)
+    with model_lock:
+        return model(images, **kwargs)
+
+# Tiled inference settings for high-resolution stills in /api/detect
+TILE_SIZE = int(os.environ.get('FAW_TILE_SIZE', 640))
+TILE_OVERLAP = float(os.environ.get('FAW_TILE_OVERLAP', 0.2))
+TILE_BATCH_SIZE = int(os.environ.get('FAW_TILE_BATCH_SIZE', 16))
+TILE_MERGE_IOS = float(os.environ.get('FAW_TILE_MERGE_IOS', 0.6))
+
+def tile_offsets(length, tile, stride):
+    """Start offsets along one axis so overlapping tiles cover the whole length."""
+    if length <= tile:
+        return [0]
+    return list(range(0, length - tile, stride)) + [length - tile]
+
+def merge_tile_boxes(data, threshold):
+    """Cross-tile NMS over (x1, y1, x2, y2, conf, cls) rows.
+
+    Overlap is measured as intersection over the smaller box, so a plant cut in
+    half at a tile edge collapses into the full detection from the neighbouring tile.
+    """
+    areas = (data[:, 2] - data[:, 0]) * (data[:, 3] - data[:, 1])
+    order = np.argsort(-data[:, 4])
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        inter_w = np.clip(np.minimum(data[i, 2], data[rest, 2]) - np.maximum(data[i, 0], data[rest, 0]), 0, None)
+        inter_h = np.clip(np.minimum(data[i, 3], data[rest, 3]) - np.maximum(data[i, 1], data[rest, 1]), 0, None)
+        ios = inter_w * inter_h / np.maximum(np.minimum(areas[i], areas[rest]), 1e-9)
+        order = rest[ios <= threshold]
+    return data[keep]
+
+def run_tiled(img, tile_size=TILE_SIZE, overlap=TILE_OVERLAP, batch_size=TILE_BATCH_SIZE, **kwargs):
+    """Run overlapping tiles of a large image through the model and merge them into one Results."""
+    frame = to_bgr_array(img)
+    h, w = frame.shape[:2]
+    stride = max(1, int(tile_size * (1 - overlap)))
+    tiles = []
+    offsets = []
+    for y in tile_offsets(h, tile_size, stride):
+        for x in tile_offsets(w, tile_size, stride):
+            tiles.append(frame[y:y + tile_size, x:x + tile_size])
+            offsets.append((x, y))
+
+    chunks = [tiles[i:i + batch_size] for i in range(0, len(tiles), batch_size)]
+    if inference_pool is not None:
+        # Submit every chunk up front so they run on several workers at once
+        futures = [inference_pool.submit(chunk, imgsz=tile_size, **kwargs) for chunk in chunks]
+        outputs = [result for future in futures for result in future.result(inference_pool.timeout)]
+    else:
+        outputs = [result for chunk in chunks for result in run_model(chunk, imgsz=tile_size, **kwargs)]
+
+    boxes = []
+    for result, (x, y) in zip(outputs, offsets):
+        data = result.boxes.data.cpu().numpy().copy()
+        data[:, [0, 2]] += x
+        data[:, [1, 3]] += y
+        boxes.append(data)
+    merged = merge_tile_boxes(np.concatenate(boxes), TILE_MERGE_IOS) if boxes else np.zeros((0, 6), np.float32)
+    import torch
+    from ultralytics.engine.results import Results
+    names = inference_pool.names if inference_pool is not None else model.names
+    return Results(frame, path='', names=names, boxes=torch.from_numpy(merged))
+
+def use_tiles(img, mode, tile_size):
+    """Decide whether an upload runs tiled: 'tiled' always, 'auto' once it is much larger than a tile."""
+    if mode == 'tiled':
+        return True
+    return mode == 'auto' and max(img.size) > 2 * tile_size
+
+# Scene-change gate for /detect: frames that barely differ reuse the last detections
+SCENE_GATE_ENABLED = os.environ.get('FAW_SCENE_GATE', '1') == '1'
+SCENE_GATE_THRESHOLD = float(os.environ.get('FAW_SCENE_GATE_THRESHOLD', 4.0))
+SCENE_GATE_MAX_AGE = float(os.environ.get('FAW_SCENE_GATE_MAX_AGE', 10))
+SCENE_GATE_MAX_SOURCES = 256
 
-# Global variable to store detected objects
-tracked_objects = set()
+class SceneGate:
+    """Return cached detections for frames that match the last inferred frame of the same source.
+
+    Frames are compared as 32x32 grayscale thumbnails by mean absolute difference
+    (0-255 scale). The reference is only replaced when inference actually runs,
+    so slow drift still adds up to a re-run, and max_age forces one periodically.
+    """
+
+    def __init__(self, threshold, max_age):
+        self.threshold = threshold
+        self.max_age = max_age
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.inference_ms = deque(maxlen=100)
+        self.saved_ms = 0.0
+
+    @staticmethod
+    def signature(img):
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def lookup(self, source, signature):
+        """Return the cached response for an unchanged scene, or None if inference must run."""
+        with self.lock:
+            entry = self.entries.get(source)
+            if entry is not None:
+                reference, response, stamp = entry
+                if (time.time() - stamp <= self.max_age
+                        and float(np.abs(signature - reference).mean()) <= self.threshold):
+                    self.hits += 1
+                    if self.inference_ms:
+                        self.saved_ms += sum(self.inference_ms) / len(self.inference_ms)
+                    return response
+            self.misses += 1
+            return None
+
+    def store(self, source, signature, response, inference_ms):
+        with self.lock:
+            self.entries.pop(source, None)
+            if len(self.entries) >= SCENE_GATE_MAX_SOURCES:
+                self.entries.pop(next(iter(self.entries)))
+            self.entries[source] = (signature, response, time.time())
+            self.inference_ms.append(inference_ms)
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0,
+                'cpu_seconds_saved': round(self.saved_ms / 1000, 2),
+                'sources': len(self.entries)
+            }
+
+scene_gate = SceneGate(SCENE_GATE_THRESHOLD, SCENE_GATE_MAX_AGE) if SCENE_GATE_ENABLED else None
+
+def frame_source():
+    """Identify which camera or browser a /detect frame came from."""
+    return request.headers.get('X-Source-Id') or request.args.get('source') or request.remote_addr
+
+# Micro-batching settings for /detect inference
+BATCH_MAX_SIZE = int(os.environ.get('FAW_BATCH_MAX_SIZE', 8))
+BATCH_MAX_WAIT_MS = float(os.environ.get('FAW_BATCH_MAX_WAIT_MS', 20))
+
+class InferenceScheduler:
+    """Collect frames from concurrent requests and run them as one batched model call."""
+
+    def __init__(self, max_batch_size, max_wait_ms, concurrency=1, **model_kwargs):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.model_kwargs = model_kwargs
+        self.queue = Queue()
+        self.lock = threading.Lock()
+        self.gather_lock = threading.Lock()
+        self.batch_sizes = Counter()
+        self.wait_times = deque(maxlen=1000)
+        self.total_requests = 0
+        self.total_batches = 0
+        # One dispatcher per worker process keeps every worker busy with its own batch
+        self.threads = [threading.Thread(target=self._run, daemon=True) for _ in range(max(1, concurrency))]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, img, timeout=None):
+        """Queue a frame for inference and block until its result is ready."""
+        future = Future()
+        self.queue.put((img, future, time.perf_counter()))
+        return future.result(timeout)
+
+    def _run(self):
+        while True:
+            # Only one dispatcher gathers at a time so batches fill up under load
+            with self.gather_lock:
+                first = self.queue.get()
+                batch = [first]
+                # The deadline is anchored on the oldest frame so it never waits longer than max_wait
+                deadline = first[2] + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self.queue.get(timeout=remaining))
+                    except Empty:
+                        break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        started = time.perf_counter()
+        try:
+            results = run_model([img for img, _, _ in batch], **self.model_kwargs)
+        except Exception as e:
+            logger.error(f"Batched inference error: {e}")
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        with self.lock:
+            self.total_batches += 1
+            self.total_requests += len(batch)
+            self.batch_sizes[len(batch)] += 1
+            for _, _, queued_at in batch:
+                self.wait_times.append((started - queued_at) * 1000)
+
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self):
+        """Return queue depth, batch-size histogram and per-request wait times."""
+        with self.lock:
+            waits = sorted(self.wait_times)
+            histogram = dict(sorted(self.batch_sizes.items()))
+            total_requests = self.total_requests
+            total_batches = self.total_batches
+
+        def percentile(p):
+            return round(waits[min(len(waits) - 1, int(len(waits) * p))], 2) if waits else 0
+
+        return {
+            'queue_depth': self.queue.qsize(),
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'total_requests': total_requests,
+            'total_batches': total_batches,
+            'batch_size_histogram': histogram,
+            'wait_ms': {
+                'mean': round(sum(waits) / len(waits), 2) if waits else 0,
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'max': round(waits[-1], 2) if waits else 0
+            }
+        }
 
 # Initialize SQLite database
 def get_db_connection():
@@ -52,7 +551,7 @@ def get_db_connection():
     conn.row_factory = sqlite3.Row
     return conn
 
-def init_db():
+def init_detections_db():
     with get_db_connection() as conn:
         conn.execute('''CREATE TABLE IF NOT EXISTS detections
                      (id INTEGER PRIMARY KEY, 
@@ -66,10 +565,220 @@ def init_db():
                       not_infested_count INTEGER)''')
         conn.commit()
 
-init_db()
+init_detections_db()
+
+BATCH_SUMMARY_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS batch_summaries (
+    batch_key INTEGER PRIMARY KEY,
+    infested_count INTEGER NOT NULL DEFAULT 0,
+    not_infested_count INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS corn_plants_summary_insert AFTER INSERT ON corn_plants
+BEGIN
+    INSERT INTO batch_summaries (batch_key, infested_count, not_infested_count, total)
+    VALUES (
+        IFNULL(NEW.batch_id, 0),
+        CASE WHEN NEW.status = 'INFESTED' THEN 1 ELSE 0 END,
+        CASE WHEN NEW.status = 'NOT INFESTED' THEN 1 ELSE 0 END,
+        1
+    )
+    ON CONFLICT(batch_key) DO UPDATE SET
+        infested_count = infested_count + excluded.infested_count,
+        not_infested_count = not_infested_count + excluded.not_infested_count,
+        total = total + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS corn_plants_summary_delete AFTER DELETE ON corn_plants
+BEGIN
+    UPDATE batch_summaries SET
+        infested_count = infested_count - (CASE WHEN OLD.status = 'INFESTED' THEN 1 ELSE 0 END),
+        not_infested_count = not_infested_count - (CASE WHEN OLD.status = 'NOT INFESTED' THEN 1 ELSE 0 END),
+        total = total - 1
+    WHERE batch_key = IFNULL(OLD.batch_id, 0);
+    DELETE FROM batch_summaries WHERE batch_key = IFNULL(OLD.batch_id, 0) AND total <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS corn_plants_summary_update AFTER UPDATE OF batch_id, status ON corn_plants
+BEGIN
+    UPDATE batch_summaries SET
+        infested_count = infested_count - (CASE WHEN OLD.status = 'INFESTED' THEN 1 ELSE 0 END),
+        not_infested_count = not_infested_count - (CASE WHEN OLD.status = 'NOT INFESTED' THEN 1 ELSE 0 END),
+        total = total - 1
+    WHERE batch_key = IFNULL(OLD.batch_id, 0);
+    INSERT INTO batch_summaries (batch_key, infested_count, not_infested_count, total)
+    VALUES (
+        IFNULL(NEW.batch_id, 0),
+        CASE WHEN NEW.status = 'INFESTED' THEN 1 ELSE 0 END,
+        CASE WHEN NEW.status = 'NOT INFESTED' THEN 1 ELSE 0 END,
+        1
+    )
+    ON CONFLICT(batch_key) DO UPDATE SET
+        infested_count = infested_count + excluded.infested_count,
+        not_infested_count = not_infested_count + excluded.not_infested_count,
+        total = total + 1;
+    DELETE FROM batch_summaries WHERE batch_key = IFNULL(OLD.batch_id, 0) AND total <= 0;
+END;
+'''
+
+# Re-uploaded images count towards every batch linked to their stored plants.
+# Plants only change batch while their links are repointed (delete_batch), which
+# these insert/delete triggers already balance, so no update trigger is needed.
+LINK_SUMMARY_SCHEMA = '''
+CREATE TRIGGER IF NOT EXISTS image_batches_summary_insert AFTER INSERT ON image_batches
+WHEN NEW.batch_id IS NOT NEW.stored_batch_id
+BEGIN
+    INSERT INTO batch_summaries (batch_key, infested_count, not_infested_count, total)
+    SELECT NEW.batch_id,
+           SUM(CASE WHEN status = 'INFESTED' THEN 1 ELSE 0 END),
+           SUM(CASE WHEN status = 'NOT INFESTED' THEN 1 ELSE 0 END),
+           COUNT(*)
+    FROM corn_plants
+    WHERE content_hash = NEW.content_hash AND batch_id IS NEW.stored_batch_id
+    HAVING COUNT(*) > 0
+    ON CONFLICT(batch_key) DO UPDATE SET
+        infested_count = infested_count + excluded.infested_count,
+        not_infested_count = not_infested_count + excluded.not_infested_count,
+        total = total + excluded.total;
+END;
+
+CREATE TRIGGER IF NOT EXISTS image_batches_summary_delete AFTER DELETE ON image_batches
+WHEN OLD.batch_id IS NOT OLD.stored_batch_id
+BEGIN
+    UPDATE batch_summaries SET (infested_count, not_infested_count, total) = (
+        SELECT infested_count - IFNULL(SUM(CASE WHEN status = 'INFESTED' THEN 1 ELSE 0 END), 0),
+               not_infested_count - IFNULL(SUM(CASE WHEN status = 'NOT INFESTED' THEN 1 ELSE 0 END), 0),
+               total - COUNT(*)
+        FROM corn_plants
+        WHERE content_hash = OLD.content_hash AND batch_id IS OLD.stored_batch_id)
+    WHERE batch_key = OLD.batch_id;
+    DELETE FROM batch_summaries WHERE batch_key = OLD.batch_id AND total <= 0;
+END;
+'''
+
+# R*Tree over plant GPS positions, kept in sync with corn_plants by triggers.
+# R*Tree stores 32-bit floats rounded outwards, so queries re-check the exact columns.
+PLANT_RTREE_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS corn_plants_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon);
+
+CREATE TRIGGER IF NOT EXISTS corn_plants_rtree_insert AFTER INSERT ON corn_plants
+WHEN NEW.gps_lat IS NOT NULL AND NEW.gps_lon IS NOT NULL
+BEGIN
+    INSERT INTO corn_plants_rtree VALUES (NEW.id, NEW.gps_lat, NEW.gps_lat, NEW.gps_lon, NEW.gps_lon);
+END;
+
+CREATE TRIGGER IF NOT EXISTS corn_plants_rtree_delete AFTER DELETE ON corn_plants
+BEGIN
+    DELETE FROM corn_plants_rtree WHERE id = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS corn_plants_rtree_update AFTER UPDATE OF gps_lat, gps_lon ON corn_plants
+BEGIN
+    DELETE FROM corn_plants_rtree WHERE id = OLD.id;
+    INSERT INTO corn_plants_rtree
+    SELECT NEW.id, NEW.gps_lat, NEW.gps_lat, NEW.gps_lon, NEW.gps_lon
+    WHERE NEW.gps_lat IS NOT NULL AND NEW.gps_lon IS NOT NULL;
+END;
+'''
+
+# Map tile aggregates: per Web Mercator tile, an 8x8 grid of cells with plant counts and
+# coordinate sums, so each tile can report its count, infested ratio and cluster centroids
+TILE_MIN_ZOOM = int(os.environ.get('FAW_TILE_MIN_ZOOM', 0))
+TILE_MAX_ZOOM = int(os.environ.get('FAW_TILE_MAX_ZOOM', 20))
+TILE_CELLS = 8
+
+PLANT_TILES_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS plant_tiles (
+    z INTEGER NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    cell_x INTEGER NOT NULL,
+    cell_y INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    infested INTEGER NOT NULL,
+    sum_lat REAL NOT NULL,
+    sum_lon REAL NOT NULL,
+    PRIMARY KEY (z, x, y, cell_x, cell_y)
+) WITHOUT ROWID;
+'''
+
+UPSERT_TILE_SQL = '''
+    INSERT INTO plant_tiles (z, x, y, cell_x, cell_y, count, infested, sum_lat, sum_lon)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(z, x, y, cell_x, cell_y) DO UPDATE SET
+        count = count + excluded.count,
+        infested = infested + excluded.infested,
+        sum_lat = sum_lat + excluded.sum_lat,
+        sum_lon = sum_lon + excluded.sum_lon
+    '''
+
+def tile_cell(lat, lon, z):
+    """Return (x, y, cell_x, cell_y) of the Web Mercator tile and sub-cell containing a point."""
+    n = (2 ** z) * TILE_CELLS
+    lat_rad = math.radians(max(-85.05112878, min(85.05112878, lat)))
+    gx = int((lon + 180.0) / 360.0 * n)
+    gy = int((1.0 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2.0 * n)
+    gx = min(max(gx, 0), n - 1)
+    gy = min(max(gy, 0), n - 1)
+    return gx // TILE_CELLS, gy // TILE_CELLS, gx % TILE_CELLS, gy % TILE_CELLS
+
+def plant_tile_deltas(plants, sign=1):
+    """Aggregate (lat, lon, status) plants into plant_tiles upsert rows for every zoom level."""
+    cells = {}
+    for lat, lon, status in plants:
+        if lat is None or lon is None:
+            continue
+        infested = 1 if status == 'INFESTED' else 0
+        for z in range(TILE_MIN_ZOOM, TILE_MAX_ZOOM + 1):
+            key = (z,) + tile_cell(lat, lon, z)
+            count, infested_sum, sum_lat, sum_lon = cells.get(key, (0, 0, 0.0, 0.0))
+            cells[key] = (count + 1, infested_sum + infested, sum_lat + lat, sum_lon + lon)
+    return [key + (sign * count, sign * infested, sign * sum_lat, sign * sum_lon)
+            for key, (count, infested, sum_lat, sum_lon) in cells.items()]
+
+# Bulk upload jobs and their images, so unfinished jobs survive a restart
+JOBS_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    batch_id INTEGER,
+    status TEXT NOT NULL,
+    options TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    processed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    duplicates TEXT,
+    error TEXT,
+    plants_saved INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS job_images (
+    job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    image_name TEXT,
+    path TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    candidates TEXT,
+    error TEXT,
+    PRIMARY KEY (job_id, position)
+);
+
+-- Re-uploaded images whose plants are already stored under an earlier batch
+CREATE TABLE IF NOT EXISTS image_batches (
+    batch_id INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    image_name TEXT,
+    stored_batch_id INTEGER,
+    PRIMARY KEY (batch_id, content_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_image_batches_content_hash ON image_batches (content_hash);
+'''
 
 # Initialize SQLite database
-def init_db():
+def init_plants_db():
     conn = sqlite3.connect('corn_plants.db')
     cursor = conn.cursor()
     cursor.execute('''
@@ -82,30 +791,389 @@ def init_db():
         status TEXT
     )
     ''')
-    conn.commit()
-    conn.close()
 
-init_db()
+    # Canonical plants keep the confidence of their best detection
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(corn_plants)')]
+    if 'confidence' not in columns:
+        cursor.execute('ALTER TABLE corn_plants ADD COLUMN confidence REAL')
 
-def save_to_database(batch_id, image_name, gps_lat, gps_lon, status):
-    """Save corn plant data to the database."""
-    conn = sqlite3.connect('corn_plants.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-    INSERT INTO corn_plants (batch_id, image_name, gps_lat, gps_lon, status)
-    VALUES (?, ?, ?, ?, ?)
-    ''', (batch_id, image_name, gps_lat, gps_lon, status))
+    # The SHA-256 of the source image lets a re-uploaded image link to its stored plants
+    if 'content_hash' not in columns:
+        cursor.execute('ALTER TABLE corn_plants ADD COLUMN content_hash TEXT')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_corn_plants_content_hash ON corn_plants (content_hash)')
+
+    # Per-batch counts kept current by triggers, so /api/summary never scans corn_plants.
+    # batch_key is the batch_id, with 0 standing in for rows without one.
+    has_summaries = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'batch_summaries'").fetchone()
+    cursor.executescript(BATCH_SUMMARY_SCHEMA)
+    if not has_summaries:
+        # One-time backfill for plants stored before the summary table existed
+        cursor.execute('''
+        INSERT INTO batch_summaries (batch_key, infested_count, not_infested_count, total)
+        SELECT
+            IFNULL(batch_id, 0),
+            SUM(CASE WHEN status = 'INFESTED' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN status = 'NOT INFESTED' THEN 1 ELSE 0 END),
+            COUNT(*)
+        FROM corn_plants
+        GROUP BY IFNULL(batch_id, 0)
+        ''')
+
+    has_rtree = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'corn_plants_rtree'").fetchone()
+    cursor.executescript(PLANT_RTREE_SCHEMA)
+    if not has_rtree:
+        cursor.execute('''
+        INSERT INTO corn_plants_rtree
+        SELECT id, gps_lat, gps_lat, gps_lon, gps_lon
+        FROM corn_plants
+        WHERE gps_lat IS NOT NULL AND gps_lon IS NOT NULL
+        ''')
+
+    has_tiles = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'plant_tiles'").fetchone()
+    cursor.executescript(PLANT_TILES_SCHEMA)
+    if not has_tiles:
+        plants = cursor.execute(
+            "SELECT gps_lat, gps_lon, status FROM corn_plants WHERE gps_lat IS NOT NULL AND gps_lon IS NOT NULL")
+        cursor.executemany(UPSERT_TILE_SQL, plant_tile_deltas(plants.fetchall()))
+
+    cursor.executescript(JOBS_SCHEMA)
+    # Set in the same transaction as a job's plants, so a resumed job never stores them twice
+    job_columns = [row[1] for row in cursor.execute('PRAGMA table_info(jobs)')]
+    if 'plants_saved' not in job_columns:
+        cursor.execute('ALTER TABLE jobs ADD COLUMN plants_saved INTEGER NOT NULL DEFAULT 0')
+
+    has_link_summaries = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'image_batches_summary_insert'").fetchone()
+    cursor.executescript(LINK_SUMMARY_SCHEMA)
+    if not has_link_summaries:
+        # One-time backfill for links stored before the triggers existed
+        cursor.execute('''
+        INSERT INTO batch_summaries (batch_key, infested_count, not_infested_count, total)
+        SELECT ib.batch_id,
+               SUM(CASE WHEN p.status = 'INFESTED' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN p.status = 'NOT INFESTED' THEN 1 ELSE 0 END),
+               COUNT(*)
+        FROM image_batches AS ib
+        JOIN corn_plants AS p ON p.content_hash = ib.content_hash AND p.batch_id IS ib.stored_batch_id
+        WHERE ib.batch_id IS NOT ib.stored_batch_id
+        GROUP BY ib.batch_id
+        ON CONFLICT(batch_key) DO UPDATE SET
+            infested_count = infested_count + excluded.infested_count,
+            not_infested_count = not_infested_count + excluded.not_infested_count,
+            total = total + excluded.total
+        ''')
     conn.commit()
     conn.close()
 
-def decimal_coords(coords, ref):
-    """Convert GPS coordinates to decimal format."""
-    decimal = float(coords[0] + coords[1] / 60 + coords[2] / 3600)
-    if ref in ['S', 'W']:
-        decimal = -decimal
-    return decimal
+init_plants_db()
+
+# Background database writer settings
+DB_QUEUE_SIZE = int(os.environ.get('FAW_DB_QUEUE_SIZE', 10000))
+DB_BATCH_SIZE = int(os.environ.get('FAW_DB_BATCH_SIZE', 500))
+DB_FLUSH_INTERVAL = float(os.environ.get('FAW_DB_FLUSH_INTERVAL', 0.5))
+DB_PUT_TIMEOUT = 5
+
+class DatabaseWriter:
+    """Write queued rows from a background thread, one transaction per flush.
+
+    A flush happens once batch_size rows are queued or flush_interval seconds
+    after the first queued row, whichever is first. The database runs in WAL
+    mode so request-side readers are not blocked by the writer. When the queue
+    is full, submit() blocks until there is room; only a lossy writer gives
+    up after DB_PUT_TIMEOUT seconds and drops the row.
+    """
+
+    def __init__(self, path, max_queue, batch_size, flush_interval, lossy=False):
+        self.path = path
+        self.lossy = lossy
+        self.queue = Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.flush_times = deque(maxlen=1000)
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.flushes = 0
+        self.on_flush = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, sql, rows):
+        """Queue rows for an INSERT statement, waiting for room when the queue is full."""
+        for row in rows:
+            self._put((sql, row), 1)
+
+    def submit_unit(self, statements):
+        """Queue (sql, rows) statements as one item, so they always commit in the same transaction."""
+        unit = [(sql, row) for sql, rows in statements for row in rows]
+        if unit:
+            self._put(unit, len(unit))
+
+    def _put(self, item, rows):
+        if not self.lossy:
+            # Backpressure: the caller waits rather than losing the rows
+            self.queue.put(item)
+            return
+        try:
+            self.queue.put(item, timeout=DB_PUT_TIMEOUT)
+        except Full:
+            with self.lock:
+                self.rows_dropped += rows
+            logger.error(f"Database write queue for {self.path} is full, dropping {rows} rows")
+
+    def flush(self, timeout=None):
+        """Block until every row queued so far has been committed."""
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """Drain the queue and stop the writer thread."""
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        stopping = False
+        while not stopping:
+            batch = []
+            waiters = []
+            item = self.queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    stopping = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                if isinstance(item, list):
+                    batch.extend(item)
+                else:
+                    batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except Empty:
+                    break
+            if batch:
+                self._write(conn, batch)
+            for waiter in waiters:
+                waiter.set()
+        conn.close()
+
+    def _write(self, conn, batch):
+        started = time.perf_counter()
+        try:
+            with conn:
+                # Consecutive rows for the same statement go through a single executemany
+                for sql, group in itertools.groupby(batch, key=lambda item: item[0]):
+                    conn.executemany(sql, [row for _, row in group])
+        except Exception as e:
+            logger.error(f"Database error writing {len(batch)} rows to {self.path}: {e}")
+            return
+        metrics.observe_stage('db_write', time.perf_counter() - started)
+        with self.lock:
+            self.flushes += 1
+            self.rows_written += len(batch)
+            self.flush_times.append((time.perf_counter() - started) * 1000)
+        if self.on_flush is not None:
+            self.on_flush()
+
+    def stats(self):
+        with self.lock:
+            times = sorted(self.flush_times)
+            return {
+                'queue_depth': self.queue.qsize(),
+                'flushes': self.flushes,
+                'rows_written': self.rows_written,
+                'rows_dropped': self.rows_dropped,
+                'flush_ms': {
+                    'mean': round(sum(times) / len(times), 2) if times else 0,
+                    'p95': round(times[min(len(times) - 1, int(len(times) * 0.95))], 2) if times else 0,
+                    'max': round(times[-1], 2) if times else 0
+                }
+            }
+
+# Live stream detections may be dropped under overload; survey plants and tile aggregates never are
+detection_writer = DatabaseWriter('detections.db', DB_QUEUE_SIZE, DB_BATCH_SIZE, DB_FLUSH_INTERVAL, lossy=True)
+plant_writer = DatabaseWriter('corn_plants.db', DB_QUEUE_SIZE, DB_BATCH_SIZE, DB_FLUSH_INTERVAL)
+atexit.register(detection_writer.close)
+atexit.register(plant_writer.close)
+
+INSERT_DETECTION_SQL = "INSERT INTO detections (timestamp, class, confidence) VALUES (?, ?, ?)"
+INSERT_PLANT_SQL = '''
+    INSERT INTO corn_plants (batch_id, image_name, gps_lat, gps_lon, status, confidence, content_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    '''
+LINK_IMAGE_SQL = '''
+    INSERT OR IGNORE INTO image_batches (batch_id, content_hash, image_name, stored_batch_id)
+    VALUES (?, ?, ?, ?)
+    '''
+
+def save_to_database(plants, extra=()):
+    """Queue (batch_id, image_name, gps_lat, gps_lon, status, confidence, content_hash) rows and their map tile aggregates.
+
+    Any extra (sql, rows) statements commit in the same transaction.
+    """
+    # One unit, so a flush never commits the plants without their tile aggregates
+    plant_writer.submit_unit([
+        (INSERT_PLANT_SQL, plants),
+        (UPSERT_TILE_SQL, plant_tile_deltas((lat, lon, status) for _, _, lat, lon, status, _, _ in plants))
+    ] + list(extra))
+
+# Cached /api/tiles responses, dropped whenever plant rows change
+TILE_CACHE_SIZE = 4096
+tile_cache = OrderedDict()
+tile_cache_lock = threading.Lock()
+tiles_version = int(time.time() * 1000)  # Starts from the clock so ETags never repeat across restarts
 
-font = ImageFont.truetype("arialbd.ttf", 50)
+def invalidate_tiles():
+    global tiles_version
+    with tile_cache_lock:
+        tiles_version += 1
+        tile_cache.clear()
+
+plant_writer.on_flush = invalidate_tiles
+
+# Cross-image plant deduplication for overlapping survey images
+DEDUP_DISTANCE_M = float(os.environ.get('FAW_DEDUP_DISTANCE_M', 0.5))
+FIELD_ELEVATION_M = os.environ.get('FAW_FIELD_ELEVATION_M')
+METERS_PER_DEGREE = 111320.0
+def camera_geometry(exif, field_elevation=None):
+    """Return (altitude above ground in m, horizontal FOV in rad, heading in rad), or None if unknown.
+
+    Takes read_exif() output. Altitude comes from DJI's XMP RelativeAltitude, or
+    from the EXIF GPS altitude minus the field elevation. The FOV comes from the
+    35 mm equivalent focal length. Heading is the gimbal yaw, or the EXIF image
+    direction, defaulting to north-up.
+    """
+    altitude = exif.get('relative_altitude')
+    if altitude is None and field_elevation is not None and 'altitude' in exif:
+        altitude = exif['altitude'] - field_elevation
+    focal_35mm = exif.get('focal_length_35mm')
+    if altitude is None or altitude <= 0 or not focal_35mm:
+        return None
+    hfov = 2 * math.atan(36.0 / (2 * float(focal_35mm)))
+
+    heading = exif.get('gimbal_yaw', exif.get('img_direction'))
+    return altitude, hfov, math.radians(heading or 0.0)
+
+def project_to_ground(gps, geometry, image_size, box):
+    """Approximate the GPS position of a box center, assuming a nadir camera over flat ground."""
+    if geometry is None:
+        return gps['lat'], gps['lon']
+    altitude, hfov, heading = geometry
+    width, height = image_size
+    meters_per_px = 2 * altitude * math.tan(hfov / 2) / width
+    dx = ((box[0] + box[2]) / 2 - width / 2) * meters_per_px
+    dy = (height / 2 - (box[1] + box[3]) / 2) * meters_per_px
+    east = dx * math.cos(heading) + dy * math.sin(heading)
+    north = -dx * math.sin(heading) + dy * math.cos(heading)
+    lat = gps['lat'] + north / METERS_PER_DEGREE
+    lon = gps['lon'] + east / (METERS_PER_DEGREE * math.cos(math.radians(gps['lat'])))
+    return lat, lon
+
+def deduplicate_plants(candidates, distance):
+    """Merge detections of the same plant seen in different images.
+
+    Candidates are dicts with image, lat, lon, status and confidence. They are
+    visited from the most to the least confident, and each one joins the first
+    canonical plant from another image within `distance` meters, found through
+    a spatial hash with `distance`-sized cells. Boxes from the same image are
+    never merged, since they are already separate plants, and neither are
+    candidates without a ground projection ('projected' unset), whose
+    position is only the camera's. Candidates marked 'stored' (already in
+    corn_plants) go first, so new sightings merge into them instead of being
+    inserted again. A plant is infested if any of its sightings was, so an
+    infested sighting never merges into a stored plant that is not. Returns
+    the canonical plants, each carrying the best confidence and the number
+    of merged sightings.
+    """
+    plants = []
+    grid = {}
+    for candidate in sorted(candidates, key=lambda c: (not c.get('stored'), -c['confidence'])):
+        if not candidate.get('projected') or distance <= 0:
+            plants.append(dict(candidate, images={candidate['image']}, sightings=1))
+            continue
+
+        x = candidate['lon'] * METERS_PER_DEGREE * math.cos(math.radians(candidate['lat']))
+        y = candidate['lat'] * METERS_PER_DEGREE
+        cell = (int(x // distance), int(y // distance))
+        neighbours = (plant for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                      for plant in grid.get((cell[0] + dx, cell[1] + dy), ()))
+        infested = candidate['status'] == 'INFESTED'
+        match = next((plant for plant in neighbours
+                      if candidate['image'] not in plant['images']
+                      and not (infested and plant.get('stored') and plant['status'] != 'INFESTED')
+                      and math.hypot(plant['x'] - x, plant['y'] - y) <= distance), None)
+        if match:
+            match['images'].add(candidate['image'])
+            match['sightings'] += 1
+            if infested:
+                match['status'] = 'INFESTED'
+            candidate['detection']['duplicate'] = True
+        else:
+            plant = dict(candidate, images={candidate['image']}, sightings=1, x=x, y=y)
+            grid.setdefault(cell, []).append(plant)
+            plants.append(plant)
+    return plants
+
+# Decode large JPEGs at 1/2, 1/4 or 1/8 scale when that still covers the inference size
+REDUCED_DECODE_ENABLED = os.environ.get('FAW_REDUCED_DECODE', '1') == '1'
+REDUCED_DECODE_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2
+}
+# Start-of-frame markers (SOF0-SOF15 without DHT, JPG and DAC)
+SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def jpeg_dimensions(data):
+    """Read (width, height) from a JPEG's SOF segment without decoding it; None if unavailable."""
+    if data[:2] != b'\xff\xd8':
+        return None
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # Fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # Standalone markers have no length
+            i += 2
+            continue
+        if marker == 0xDA:  # Start of scan reached without a frame header
+            return None
+        if marker in SOF_MARKERS:
+            if i + 9 > len(data):
+                return None
+            height = int.from_bytes(data[i + 5:i + 7], 'big')
+            width = int.from_bytes(data[i + 7:i + 9], 'big')
+            return width, height
+        i += 2 + int.from_bytes(data[i + 2:i + 4], 'big')
+    return None
+
+def decode_frame(img_bytes, imgsz=640):
+    """Decode an uploaded frame, using libjpeg's DCT scaling when the JPEG is much larger than imgsz."""
+    nparr = np.frombuffer(img_bytes, np.uint8)
+    dimensions = jpeg_dimensions(img_bytes) if REDUCED_DECODE_ENABLED else None
+    if dimensions:
+        for factor, flag in REDUCED_DECODE_FLAGS.items():
+            if max(dimensions) // factor >= imgsz:
+                img = cv2.imdecode(nparr, flag)
+                if img is not None:
+                    return img
+                break
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
 
 @app.route('/detect', methods=['POST'])
 def detect_faw():
@@ -119,9 +1187,11 @@ def detect_faw():
             return {"error": "No image data received"}, 400
 
         try:
-            nparr = np.frombuffer(img_bytes, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
+            # Boxes are returned normalized (xywhn), so a reduced decode needs no rescaling
+            started = time.perf_counter()
+            img = decode_frame(img_bytes, imgsz=640)
+            metrics.observe_stage('decode', time.perf_counter() - started)
+
             if img is None or img.size == 0:
                 logger.warning("Invalid or empty image data")
                 return {"error": "Invalid or empty image data"}, 400
@@ -129,83 +1199,98 @@ def detect_faw():
             logger.error(f"Image decoding error: {e}")
             return {"error": "Invalid image data"}, 400
 
-        # Run YOLOv8 inference
-        try:
-            results = model(img, imgsz=640, conf=0.5, iou=0.5)
-            if not results or len(results) == 0:
+        # Skip inference when the scene has not changed since this source's last inferred frame
+        source = frame_source()
+        signature = None
+        if scene_gate is not None:
+            signature = scene_gate.signature(img)
+            cached = scene_gate.lookup(source, signature)
+            if cached is not None:
+                with counts_lock:
+                    if source in trackers:
+                        trackers[source].touch(cached['track_ids'], time.time())
                 return jsonify({
                     'infested_count': detection_counts["infested"],
                     'not_infested_count': detection_counts["not_infested"],
-                    'boxes': [],
-                    'classes': [],
-                    'confidences': []
+                    **cached,
+                    'cached': True
                 })
+
+        # Run YOLOv8 inference, batched with concurrent requests by the scheduler
+        try:
+            results = [inference_scheduler.submit(img)]
         except Exception as e:
             logger.error(f"Inference error: {e}")
             return {"error": "Model inference failed"}, 500
 
+        metrics.observe_speed(results[0].speed)
+
         # Process results
         boxes = []
         classes = []
         confidences = []
-        current_infested = 0
-        current_not_infested = 0
 
         if results[0].boxes is not None:
             boxes = results[0].boxes.xywhn.cpu().numpy().tolist()
             classes = results[0].boxes.cls.cpu().numpy().tolist()
             confidences = results[0].boxes.conf.cpu().numpy().tolist()
 
-            # Update counts
-            for cls in classes:
-                if cls == 0:  # Assuming 0 is infested
-                    current_infested += 1
-                else:
-                    current_not_infested += 1
+        # Match boxes to this source's tracks so each plant is counted once
+        ids, counted = update_tracks(source, boxes, classes)
 
-            # Update global counts in a thread-safe way
-            with threading.Lock():
-                detection_counts["infested"] += current_infested
-                detection_counts["not_infested"] += current_not_infested
+        # Queue one detection row per newly counted plant for the background database writer
+        if counted:
+            timestamp = datetime.now().isoformat()
+            confidence_by_id = dict(zip(ids, confidences))
+            detection_writer.submit(INSERT_DETECTION_SQL, [
+                (timestamp, "infested" if track['infested'] else "not_infested", float(confidence_by_id[track['id']]))
+                for track in counted
+            ])
 
-            # Store detections in database
+        # Render the annotated frame only for live stream viewers or an explicit ?annotate=1
+        annotated_jpeg = None
+        annotate = request.args.get('annotate') in ('1', 'true')
+        if annotate or frame_broadcaster.has_clients():
             try:
-                conn = get_db_connection()
-                timestamp = datetime.now().isoformat()
-                for cls, conf in zip(classes, confidences):
-                    conn.execute(
-                        "INSERT INTO detections (timestamp, class, confidence) VALUES (?, ?, ?)",
-                        (timestamp, "infested" if cls == 0 else "not_infested", float(conf))
-                    )
-                conn.commit()
-            except Exception as e:
-                logger.error(f"Database error: {e}")
+                started = time.perf_counter()
+                annotated_img = results[0].plot()
+                metrics.observe_stage('annotate', time.perf_counter() - started)
+                started = time.perf_counter()
+                _, buffer = cv2.imencode('.jpg', annotated_img, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
+                annotated_jpeg = buffer.tobytes()
+                metrics.observe_stage('encode', time.perf_counter() - started)
+                frame_data = {
+                    'frame_id': next(frame_ids),
+                    'source': source,
+                    'timestamp': time.time(),
+                    'detections': {'boxes': boxes, 'classes': classes, 'confidences': confidences, 'track_ids': ids},
+                    'jpeg': annotated_jpeg
+                }
+
+                # Replaces any unsent frame from the same source
+                frame_broadcaster.publish(frame_data)
             except Exception as e:
-                logger.error(f"Database error: {e}")
-            finally:
-                conn.close()
+                logger.error(f"Image processing error: {e}")
 
-        # Generate annotated image
-        try:
-            annotated_img = results[0].plot()
-            _, buffer = cv2.imencode('.jpg', annotated_img, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-            frame_data = base64.b64encode(buffer.tobytes()).decode('utf-8')
-            
-            # Non-blocking frame buffer addition
-            if not frame_buffer.full():
-                frame_buffer.put(frame_data)
-        except Exception as e:
-            logger.error(f"Image processing error: {e}")
+        if scene_gate is not None:
+            inference_ms = sum(value for value in results[0].speed.values() if value)
+            scene_gate.store(source, signature,
+                             {'boxes': boxes, 'classes': classes, 'confidences': confidences, 'track_ids': ids},
+                             inference_ms)
 
         logger.info(f"Detection completed in {time.time() - start_time:.2f}s")
-        
-        return jsonify({
+
+        response = {
             'infested_count': detection_counts["infested"],
             'not_infested_count': detection_counts["not_infested"],
             'boxes': boxes,
             'classes': classes,
-            'confidences': confidences
-        })
+            'confidences': confidences,
+            'track_ids': ids
+        }
+        if annotate and annotated_jpeg is not None:
+            response['image'] = base64.b64encode(annotated_jpeg).decode('utf-8')
+        return jsonify(response)
 
     except Exception as e:
         logger.error(f"Unexpected error in /detect endpoint: {e}", exc_info=True)
@@ -214,7 +1299,7 @@ def detect_faw():
 @app.route('/reset_counts', methods=['POST'])
 def reset_counts():
     try:
-        with threading.Lock():
+        with counts_lock:
             total = detection_counts["infested"] + detection_counts["not_infested"]
             infested_percentage = (detection_counts["infested"] / total) * 100 if total > 0 else 0
             not_infested_percentage = (detection_counts["not_infested"] / total) * 100 if total > 0 else 0
@@ -231,7 +1316,9 @@ def reset_counts():
             finally:
                 conn.close()
 
-            detection_counts = {"infested": 0, "not_infested": 0}
+            # Start a new session: counts and tracks both begin from scratch
+            detection_counts.update({"infested": 0, "not_infested": 0})
+            trackers.clear()
 
             return jsonify({
                 "message": "Detection counts reset successfully",
@@ -258,7 +1345,7 @@ def get_summaries():
 @app.route('/get_percentages', methods=['GET'])
 def get_percentages():
     try:
-        with threading.Lock():
+        with counts_lock:
             total = detection_counts["infested"] + detection_counts["not_infested"]
             infested_percentage = (detection_counts["infested"] / total) * 100 if total > 0 else 0
             not_infested_percentage = (detection_counts["not_infested"] / total) * 100 if total > 0 else 0
@@ -284,125 +1371,935 @@ def delete_summary(id):
     finally:
         conn.close()
 
-def stream_frames():
-    while True:
+@app.route('/get_stats', methods=['GET'])
+def get_stats():
+    try:
+        return jsonify({
+            'model': {'backend': MODEL_BACKEND, 'path': model_path},
+            'startup': startup_state,
+            'scheduler': inference_scheduler.stats() if inference_scheduler else None,
+            'pool': inference_pool.stats() if inference_pool else None,
+            'scene_gate': scene_gate.stats() if scene_gate else None,
+            'broadcaster': frame_broadcaster.stats(),
+            'db_writers': {
+                'detections': detection_writer.stats(),
+                'corn_plants': plant_writer.stats()
+            },
+            'jobs': job_manager.stats(),
+            'result_cache': result_cache.stats() if result_cache else None
+        })
+    except Exception as e:
+        logger.error(f"Error in get_stats: {e}")
+        return {"error": "Internal server error"}, 500
+
+@socketio.on('connect')
+def handle_connect():
+    frame_broadcaster.add_client(request.sid)
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    frame_broadcaster.remove_client(request.sid)
+
+@socketio.on('frame_mode')
+def handle_frame_mode(data):
+    """Pick base64 or binary video frames and opt into ack-based flow control; the ack echoes the result."""
+    data = data or {}
+    mode = data.get('mode', 'base64')
+    if mode not in FRAME_MODES:
+        return {'error': f"Unsupported frame mode, expected one of {', '.join(FRAME_MODES)}"}
+    ack = bool(data.get('ack', False))
+    frame_broadcaster.set_mode(request.sid, mode, ack)
+    return {'mode': mode, 'ack': ack}
+
+# Content-addressed store of uploaded survey images, their detection boxes and renditions
+IMAGE_STORE_DIR = os.environ.get('FAW_IMAGE_STORE_DIR', 'image_store')
+# Longest side in pixels of each annotated rendition; None keeps the original size
+RENDITION_SIZES = {'thumb': 320, 'medium': 1280, 'full': None}
+
+class ImageStore:
+    """Keep each uploaded image once under the SHA-256 of its bytes.
+
+    Alongside the original sit the latest detection boxes for it and the
+    annotated JPEG renditions listed in RENDITION_SIZES. Renditions are named
+    after a digest of the boxes they show, so a re-run with different results
+    never serves a stale one, and their URLs carry that digest for caching.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def folder(self, content_hash):
+        return os.path.join(self.directory, content_hash[:2], content_hash)
+
+    def path(self, content_hash, name):
+        return os.path.join(self.folder(content_hash), name)
+
+    def write(self, content_hash, name, data):
+        """Write a file atomically, so readers never see it half written."""
+        os.makedirs(self.folder(content_hash), exist_ok=True)
+        target = self.path(content_hash, name)
+        scratch = f"{target}.{threading.get_ident()}.tmp"
+        with open(scratch, 'wb') as f:
+            f.write(data)
+        os.replace(scratch, target)
+        return target
+
+    def put_original(self, content_hash, img_bytes):
+        if not os.path.exists(self.path(content_hash, 'original')):
+            self.write(content_hash, 'original', img_bytes)
+
+    def put_detections(self, content_hash, detections):
+        """Record the boxes for an image, unless the same boxes are already stored, and return their digest."""
+        boxes = json.dumps([{key: d[key] for key in ('bounding_box', 'status', 'confidence')}
+                            for d in detections]).encode()
         try:
-            if not frame_buffer.empty():
-                frame_data = frame_buffer.get()
-                socketio.emit('video_frame', {"image": frame_data})
-            time.sleep(0.033)  # ~30fps
-        except Exception as e:
-            logger.error(f"Error in frame streaming: {e}")
-            time.sleep(1)
+            with open(self.path(content_hash, 'detections.json'), 'rb') as f:
+                unchanged = f.read() == boxes
+        except FileNotFoundError:
+            unchanged = False
+        if not unchanged:
+            self.write(content_hash, 'detections.json', boxes)
+        return hashlib.sha256(boxes).hexdigest()[:16]
+
+    @staticmethod
+    def rendition_name(digest, size):
+        return f"annotated-{digest}-{size}.jpg"
+
+    @staticmethod
+    def urls(content_hash, digest):
+        return {size: f"/api/images/{content_hash}/{size}?v={digest}" for size in RENDITION_SIZES}
+
+    def put_renditions(self, content_hash, digest, img):
+        """Encode every rendition of an annotated PIL image as a progressive JPEG."""
+        img = img.convert('RGB')
+        for size, longest in RENDITION_SIZES.items():
+            rendition = img
+            if longest is not None and max(img.size) > longest:
+                rendition = img.copy()
+                rendition.thumbnail((longest, longest), Image.LANCZOS)
+            buffer = io.BytesIO()
+            rendition.save(buffer, format="JPEG", quality=85 if longest else 90, progressive=True, optimize=True)
+            self.write(content_hash, self.rendition_name(digest, size), buffer.getvalue())
+
+    def rendition(self, content_hash, size):
+        """Return the path of an annotated rendition, rendering it if needed; None if the image is unknown."""
+        original = self.path(content_hash, 'original')
+        boxes_path = self.path(content_hash, 'detections.json')
+        if not os.path.exists(original) or not os.path.exists(boxes_path):
+            return None
+        with open(boxes_path, 'rb') as f:
+            boxes = f.read()
+        digest = hashlib.sha256(boxes).hexdigest()[:16]
+        target = self.path(content_hash, self.rendition_name(digest, size))
+        if not os.path.exists(target):
+            img = Image.open(original)
+            annotate_image(img, json.loads(boxes))
+            self.put_renditions(content_hash, digest, img)
+        return target
+
+image_store = ImageStore(IMAGE_STORE_DIR)
+
+# On-disk cache of /api/detect results keyed by image content, model and options
+RESULT_CACHE_DIR = os.environ.get('FAW_RESULT_CACHE_DIR', 'result_cache')
+RESULT_CACHE_MB = float(os.environ.get('FAW_RESULT_CACHE_MB', 1024))
+# Options that change what one image's result looks like; dedup_distance only acts across images
+RESULT_CACHE_OPTIONS = ('mode', 'tile_size', 'tile_overlap', 'tile_batch', 'field_elevation', 'render')
+
+class ResultCache:
+    """Store per-image results as JSON files and evict the least recently used past max_bytes.
+
+    File modification times record use, so the LRU order survives restarts.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                stat = os.stat(os.path.join(directory, name))
+                files.append((stat.st_mtime, name[:-5], stat.st_size))
+        for _, key, size in sorted(files):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    @staticmethod
+    def key(content_hash, options):
+        params = json.dumps({name: options.get(name) for name in RESULT_CACHE_OPTIONS}, sort_keys=True)
+        return hashlib.sha256(f"{content_hash}:{MODEL_VERSION}:{params}".encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached (entry, candidates) pair, or None."""
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        try:
+            with open(self.path(key)) as f:
+                cached = json.load(f)
+            os.utime(self.path(key))
+        except (OSError, ValueError):
+            with self.lock:
+                self.total_bytes -= self.entries.pop(key, 0)
+            return None
+        return cached['entry'], cached['candidates']
+
+    def put(self, key, entry, candidates):
+        data = json.dumps({'entry': entry, 'candidates': candidates})
+        # Write then rename, so a concurrent reader never sees half a file
+        scratch = f"{self.path(key)}.{threading.get_ident()}.tmp"
+        with open(scratch, 'w') as f:
+            f.write(data)
+        os.replace(scratch, self.path(key))
+
+        with self.lock:
+            self.total_bytes += len(data) - self.entries.pop(key, 0)
+            self.entries[key] = len(data)
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                old_key, size = self.entries.popitem(last=False)
+                self.total_bytes -= size
+                try:
+                    os.remove(self.path(old_key))
+                except OSError:
+                    pass
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'megabytes': round(self.total_bytes / 1024 / 1024, 2),
+                'max_megabytes': round(self.max_bytes / 1024 / 1024, 2),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0
+            }
+
+result_cache = ResultCache(RESULT_CACHE_DIR, int(RESULT_CACHE_MB * 1024 * 1024)) if RESULT_CACHE_MB > 0 else None
+
+def stored_batch(content_hash):
+    """Return the batch that already holds plants from this image, or None."""
+    conn = sqlite3.connect('corn_plants.db')
+    try:
+        row = conn.execute('SELECT batch_id FROM corn_plants WHERE content_hash = ? LIMIT 1',
+                           (content_hash,)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+def survey_options(values):
+    """Parse the per-upload inference and deduplication options; raises ValueError on bad input."""
+    # Inference mode per request: full (default), tiled, or auto for large stills
+    options = {
+        'mode': values.get('mode', 'full'),
+        'tile_size': int(values.get('tile_size', TILE_SIZE)),
+        'tile_overlap': float(values.get('tile_overlap', TILE_OVERLAP)),
+        'tile_batch': int(values.get('tile_batch', TILE_BATCH_SIZE)),
+        # Ground distance within which detections from different images count as one plant (0 disables)
+        'dedup_distance': float(values.get('dedup_distance', DEDUP_DISTANCE_M)),
+        'field_elevation': values.get('field_elevation', FIELD_ELEVATION_M),
+        # cache=0 forces a fresh run for this upload
+        'cache': values.get('cache', '1') not in ('0', 'false'),
+        # 'url' links to stored renditions, 'image' returns the annotated JPEG inline as base64,
+        # 'vector' returns only boxes and renders nothing until /api/annotated is requested
+        'render': values.get('render', 'url')
+    }
+    if options['field_elevation'] in (None, ''):
+        options['field_elevation'] = None
+    else:
+        options['field_elevation'] = float(options['field_elevation'])
+    if (options['mode'] not in ('full', 'tiled', 'auto') or options['tile_size'] < 32
+            or not 0 <= options['tile_overlap'] < 1 or options['tile_batch'] < 1):
+        raise ValueError(f"Invalid tiling parameters: {options}")
+    if options['render'] not in ('url', 'image', 'vector'):
+        raise ValueError(f"Invalid render mode: {options['render']}")
+    return options
+
+def annotate_image(img, detections):
+    """Draw detection boxes and status labels onto a PIL image in place."""
+    draw = ImageDraw.Draw(img)
+    for detection in detections:
+        x1, y1, x2, y2 = detection['bounding_box']
+        status = detection['status']
+        confidence = detection['confidence']
+
+        # Set bounding box color based on status
+        color = "red" if status == "INFESTED" else "green"
+        draw.rectangle([x1, y1, x2, y2], outline=color, width=5)
+
+        # Adjust text position to ensure visibility
+        text_x = x1
+        text_y = y1 - 70 if y1 > 70 else y2 + 10  # Place above the box if there's space, otherwise below
+
+        # Add label with bold status and confidence
+        draw.text((text_x, text_y), f"{status} ({confidence:.2f}%)", fill=color, font=font)
+
+# Staged /api/detect pipeline: decode/EXIF threads, batched model calls, annotate/encode threads
+PIPELINE_DECODE_WORKERS = int(os.environ.get('FAW_PIPELINE_DECODE_WORKERS', 4))
+PIPELINE_ENCODE_WORKERS = int(os.environ.get('FAW_PIPELINE_ENCODE_WORKERS', 4))
+# Large enough by default to give every inference worker an image per batch
+PIPELINE_BATCH_SIZE = int(os.environ.get('FAW_PIPELINE_BATCH_SIZE', max(4, INFERENCE_WORKERS)))
+# Most images allowed to wait between two stages of one upload
+PIPELINE_QUEUE_SIZE = int(os.environ.get('FAW_PIPELINE_QUEUE_SIZE', 2 * PIPELINE_BATCH_SIZE))
+
+decode_executor = ThreadPoolExecutor(PIPELINE_DECODE_WORKERS, thread_name_prefix='survey-decode')
+encode_executor = ThreadPoolExecutor(PIPELINE_ENCODE_WORKERS, thread_name_prefix='survey-encode')
+
+def elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000, 2)
+
+def decode_survey_image(image_name, read, options):
+    """Stage 1: read and hash an upload, check the result cache, then parse EXIF and decode it."""
+    started = time.perf_counter()
+    img_bytes = read()
+    content_hash = hashlib.sha256(img_bytes).hexdigest()
+    image_store.put_original(content_hash, img_bytes)
+    work = {'image_name': image_name, 'content_hash': content_hash, 'cached': None,
+            'timings': {'read_ms': elapsed_ms(started)}}
+
+    if result_cache is not None and options.get('cache', True):
+        work['cache_key'] = result_cache.key(content_hash, options)
+        work['cached'] = result_cache.get(work['cache_key'])
+        if work['cached'] is not None:
+            return work
+
+    # Extract GPS data from the JPEG header only
+    started = time.perf_counter()
+    gps_data = {}
+    exif = read_exif(img_bytes)
+    if 'lat' in exif and 'lon' in exif:
+        gps_data = {'lat': exif['lat'], 'lon': exif['lon']}
+    work['gps'] = gps_data
+    work['geometry'] = camera_geometry(exif, options['field_elevation']) if gps_data else None
+    work['timings']['exif_ms'] = elapsed_ms(started)
+
+    started = time.perf_counter()
+    img = Image.open(io.BytesIO(img_bytes))
+    img.load()
+    work['img'] = img
+    work['timings']['decode_ms'] = elapsed_ms(started)
+    return work
+
+def detect_survey_batch(works, options):
+    """Stage 2: model calls for the full-frame images in the batch; tiled images run one by one.
+
+    With the worker pool, the full-frame images are split into one chunk per
+    worker and all chunks are submitted before tiling starts, so every worker
+    has an image and the chunks run alongside the tiles.
+    """
+    full = [work for work in works if not use_tiles(work['img'], options['mode'], options['tile_size'])]
+    tiled = [work for work in works if work not in full]
+    if full and inference_pool is not None:
+        size = math.ceil(len(full) / INFERENCE_WORKERS)
+        chunks = [full[i:i + size] for i in range(0, len(full), size)]
+        submitted = time.perf_counter()
+        futures = [inference_pool.submit([work['img'] for work in chunk]) for chunk in chunks]
+        # Each chunk's finish time is taken when it completes, so tiling below is not counted
+        finished = Queue()
+        for future in futures:
+            future.add_done_callback(lambda future: finished.put(time.perf_counter()))
+    for work in tiled:
+        started = time.perf_counter()
+        work['result'] = run_tiled(work['img'], options['tile_size'], options['tile_overlap'], options['tile_batch'])
+        work['timings'].update(inference_ms=elapsed_ms(started), batch_size=1)
+    if full:
+        if inference_pool is not None:
+            results = [result for future in futures for result in future.result(inference_pool.timeout)]
+            full_ms = (max(finished.get() for _ in futures) - submitted) * 1000
+        else:
+            started = time.perf_counter()
+            results = run_model([work['img'] for work in full])
+            full_ms = elapsed_ms(started)
+        share = full_ms / len(full)
+        for work, result in zip(full, results):
+            work['result'] = result
+            work['timings'].update(inference_ms=round(share, 2), batch_size=len(full))
+    for work in works:
+        # The model's own split of its time for this image
+        for stage, value in (work['result'].speed or {}).items():
+            if value is not None:
+                work['timings'][f"model_{stage}_ms"] = round(value, 2)
+
+def finish_survey_image(work, options):
+    """Stage 3: turn boxes into detections and plant candidates, annotate and encode, update the caches.
+
+    Returns the image's response entry and its plant candidates for
+    deduplicate_plants(). Each candidate keeps a reference to its detection
+    dict, so the duplicate flag can be set once the whole upload is known. If
+    plants from the same image bytes are already stored, the candidates are
+    marked 'stored' so save_survey_plants() links the image instead.
+    """
+    image_name = work['image_name']
+    content_hash = work['content_hash']
+    timings = work['timings']
+
+    if work['cached'] is not None:
+        entry, candidates = work['cached']
+        entry = dict(entry, image_name=image_name)
+        for candidate in candidates:
+            candidate.update(image=image_name, detection=entry['detections'][candidate['index']])
+        # Keep the boxes so renditions can be rendered again on demand
+        image_store.put_detections(content_hash, entry['detections'])
+    else:
+        img = work['img']
+        gps_data = work['gps']
+        image_detections = []  # Store all detections for this image
+        candidates = []
+
+        boxes = work['result'].boxes
+        if boxes is not None:
+            for box in boxes:
+                # Extract bounding box and confidence
+                x1, y1, x2, y2 = box.xyxy[0].tolist()
+                confidence = float(box.conf.item()) * 100  # Convert to percentage
+                class_id = int(box.cls.item())
+                status = 'INFESTED' if class_id == 0 else 'NOT INFESTED'
+
+                # Filter out low-confidence detections (optional)
+                if confidence < 50:
+                    continue
+
+                # Add detection to the list
+                detection = {
+                    'bounding_box': [x1, y1, x2, y2],
+                    'status': status,
+                    'confidence': confidence,
+                    'duplicate': False
+                }
+                image_detections.append(detection)
+
+                # Collect for deduplication and the database
+                plant_lat, plant_lon = (project_to_ground(gps_data, work['geometry'], img.size, [x1, y1, x2, y2])
+                                        if gps_data else (None, None))
+                if work['geometry'] is not None:
+                    detection['ground'] = {'lat': plant_lat, 'lon': plant_lon}
+                candidates.append({'image': image_name, 'index': len(image_detections) - 1,
+                                   'lat': plant_lat, 'lon': plant_lon, 'projected': 'ground' in detection,
+                                   'status': status,
+                                   'confidence': confidence, 'detection': detection})
+
+        # Keep the boxes so renditions can be rendered again on demand; the digest versions their URLs
+        digest = image_store.put_detections(content_hash, image_detections)
+
+        # Vector responses leave drawing to the client or to /api/annotated
+        base64_image = None
+        image_urls = None
+        if options['render'] != 'vector':
+            started = time.perf_counter()
+            annotate_image(img, image_detections)
+            timings['annotate_ms'] = elapsed_ms(started)
+
+            started = time.perf_counter()
+            if options['render'] == 'image':
+                # Convert image with bounding boxes to Base64
+                buffer = io.BytesIO()
+                img.save(buffer, format="JPEG")
+                base64_image = base64.b64encode(buffer.getvalue()).decode("utf-8")
+            else:
+                image_store.put_renditions(content_hash, digest, img)
+                image_urls = image_store.urls(content_hash, digest)
+            timings['encode_ms'] = elapsed_ms(started)
+
+        entry = {
+            'image': base64_image,
+            'images': image_urls,
+            'image_name': image_name,
+            'gps': gps_data,
+            'detections': image_detections
+        }
+        if 'cache_key' in work:
+            result_cache.put(work['cache_key'], entry,
+                             [{k: v for k, v in c.items() if k != 'detection'} for c in candidates])
+
+
+    linked_batch = stored_batch(content_hash)
+    for candidate in candidates:
+        candidate.update(content_hash=content_hash, stored=linked_batch is not None)
+    entry = dict(entry, content_hash=content_hash, cached=work['cached'] is not None, linked_batch=linked_batch,
+                 annotated_url=f"/api/annotated/{content_hash}", timings=timings)
+    metrics.observe_timings(timings)
+    return entry, candidates
+
+def survey_pipeline(uploads, options):
+    """Run uploads through the three stages and yield (image_name, entry, candidates, error) in upload order.
+
+    uploads yields (image_name, read) pairs, where read() returns the image
+    bytes. Decoding and encoding run on the shared thread pools while the
+    calling thread feeds the model, taking every image that has finished
+    decoding into one batch. At most PIPELINE_QUEUE_SIZE images of an upload
+    wait before and after the model stage, which bounds memory per upload.
+    """
+    uploads = iter(uploads)
+    decoding = deque()
+    finishing = deque()
+    exhausted = False
+
+    def fill():
+        nonlocal exhausted
+        while not exhausted and len(decoding) < PIPELINE_QUEUE_SIZE:
+            upload = next(uploads, None)
+            if upload is None:
+                exhausted = True
+                break
+            image_name, read = upload
+            decoding.append((image_name, decode_executor.submit(decode_survey_image, image_name, read, options)))
+
+    try:
+        fill()
+        while decoding or finishing:
+            # Wait for the next decoded image, then batch it with any others that are already done
+            batch = []
+            while decoding and len(finishing) + len(batch) < PIPELINE_QUEUE_SIZE and len(batch) < PIPELINE_BATCH_SIZE:
+                image_name, future = decoding[0]
+                if batch and not future.done():
+                    break
+                decoding.popleft()
+                try:
+                    batch.append(future.result())
+                except Exception as e:
+                    batch.append({'image_name': image_name, 'error': e})
+            fill()
+
+            ready = [work for work in batch if 'error' not in work and work['cached'] is None]
+            if ready:
+                try:
+                    detect_survey_batch(ready, options)
+                except Exception as e:
+                    for work in ready:
+                        work['error'] = e
+            for work in batch:
+                if 'error' in work:
+                    finishing.append((work['image_name'], work['error']))
+                else:
+                    finishing.append((work['image_name'], encode_executor.submit(finish_survey_image, work, options)))
+
+            # Hand finished images back in order; block only when the next stage is full or idle
+            while finishing:
+                image_name, pending = finishing[0]
+                must_wait = len(finishing) >= PIPELINE_QUEUE_SIZE or not decoding
+                if isinstance(pending, Future) and not pending.done() and not must_wait:
+                    break
+                finishing.popleft()
+                if not isinstance(pending, Future):
+                    yield image_name, None, None, pending
+                    continue
+                try:
+                    entry, candidates = pending.result()
+                except Exception as e:
+                    yield image_name, None, None, e
+                    continue
+                yield image_name, entry, candidates, None
+    finally:
+        # The caller stopped early: skip images that have not started decoding yet
+        for _, future in decoding:
+            future.cancel()
+
+def pipeline_totals(entries_timings):
+    """Sum per-image stage timings into per-stage totals for an upload."""
+    totals = Counter()
+    for timings in entries_timings:
+        totals.update({stage: value for stage, value in timings.items() if stage.endswith('_ms')})
+    return {stage: round(value, 2) for stage, value in totals.items()}
+
+def duplicate_detections(candidates):
+    """List the detections deduplicate_plants() merged into a plant from another image."""
+    return [{'image_name': c['image'], 'detection': c['index']}
+            for c in candidates if c['detection'].get('duplicate')]
+
+def save_survey_plants(batch_id, candidates, dedup_distance, extra=()):
+    """Deduplicate an upload's plant candidates and queue the new canonical plants; returns the duplicates.
+
+    Plants already stored from the same image bytes are linked to this batch
+    through image_batches rather than inserted a second time. The plants,
+    links and any extra (sql, rows) statements commit as one transaction.
+    """
+    plants = deduplicate_plants(candidates, dedup_distance)
+    links = {(p['content_hash'], p['image']) for p in candidates if p.get('stored')}
+    save_to_database([(batch_id, p['image'], p['lat'], p['lon'], p['status'], p['confidence'], p.get('content_hash'))
+                      for p in plants if not p.get('stored')],
+                     [(LINK_IMAGE_SQL, [(batch_id, content_hash, image, stored_batch(content_hash))
+                                        for content_hash, image in links])] + list(extra))
+    return duplicate_detections(candidates)
+
+def wants_stream():
+    """Stream /api/detect as NDJSON when asked with ?stream=1 or an application/x-ndjson Accept header."""
+    if request.values.get('stream') in ('1', 'true'):
+        return True
+    return request.accept_mimetypes.best == 'application/x-ndjson'
 
 @app.route('/api/detect', methods=['POST'])
 def detect():
-    if model is None:
-        return jsonify({'error': 'Model not loaded'}), 500
-
     if 'images' not in request.files:
         return jsonify({'error': 'No images uploaded'}), 400
 
     images = request.files.getlist('images')
-    results = []
 
     # Generate a unique batch_id for this upload
     batch_id = int(time.time())  # Use the current timestamp as the batch_id
 
-    for image_file in images:
-        try:
-            img_bytes = image_file.read()
-            image_name = image_file.filename
-
-            # Extract GPS data
-            gps_data = {}
-            tags = exifread.process_file(io.BytesIO(img_bytes), details=False)
-            if 'GPS GPSLatitude' in tags and 'GPS GPSLongitude' in tags:
-                lat = decimal_coords(tags['GPS GPSLatitude'].values, tags['GPS GPSLatitudeRef'].values)
-                lon = decimal_coords(tags['GPS GPSLongitude'].values, tags['GPS GPSLongitudeRef'].values)
-                gps_data = {'lat': lat, 'lon': lon}
-
-            # Process image
-            img = Image.open(io.BytesIO(img_bytes))
-            draw = ImageDraw.Draw(img)
-            detection_results = model(img)
-
-            image_detections = []  # Store all detections for this image
-
-            for result in detection_results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        # Extract bounding box and confidence
-                        x1, y1, x2, y2 = box.xyxy[0].tolist()
-                        confidence = float(box.conf.item()) * 100  # Convert to percentage
-                        class_id = int(box.cls.item())
-                        status = 'INFESTED' if class_id == 0 else 'NOT INFESTED'
-
-                        # Filter out low-confidence detections (optional)
-                        if confidence < 50:
-                            continue
-
-                        # Add detection to the list
-                        image_detections.append({
-                            'bounding_box': [x1, y1, x2, y2],
-                            'status': status,
-                            'confidence': confidence
-                        })
-
-                        # Set bounding box color based on status
-                        color = "red" if status == "INFESTED" else "green"
-                        draw.rectangle([x1, y1, x2, y2], outline=color, width=5)
-
-                        # Adjust text position to ensure visibility
-                        text_x = x1
-                        text_y = y1 - 70 if y1 > 70 else y2 + 10  # Place above the box if there's space, otherwise below
-
-                        # Add label with bold status and confidence
-                        draw.text((text_x, text_y), f"{status} ({confidence:.2f}%)", fill=color, font=font)
-
-                        # Save to database
-                        save_to_database(batch_id, image_name, gps_data.get('lat'), gps_data.get('lon'), status)
-
-            # Convert image with bounding boxes to Base64
-            buffer = io.BytesIO()
-            img.save(buffer, format="JPEG")
-            base64_image = base64.b64encode(buffer.getvalue()).decode("utf-8")
-
-            # Append the image and its detections to the results
-            results.append({
-                'image': base64_image,
-                'image_name': image_name,
-                'gps': gps_data,
-                'detections': image_detections
-            })
+    try:
+        options = survey_options(request.values)
+    except ValueError:
+        return jsonify({'error': 'Invalid detection parameters'}), 400
 
-        except Exception as e:
-            return jsonify({'error': str(e)}), 500
+    if wants_stream():
+        return Response(stream_with_context(stream_detect(images, batch_id, options)),
+                        mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+
+    results = []
+    candidates = []
+    for image_name, entry, image_candidates, error in survey_pipeline(
+            ((f.filename, f.read) for f in images), options):
+        if error is not None:
+            # Keep the plants found before the failing image, as earlier uploads did
+            logger.error(f"Error processing {image_name}: {error}")
+            save_survey_plants(batch_id, candidates, options['dedup_distance'])
+            return jsonify({'error': str(error)}), 500
+        results.append(entry)
+        candidates.extend(image_candidates)
+
+    # Make sure this upload is committed before the client asks for the summary
+    save_survey_plants(batch_id, candidates, options['dedup_distance'])
+    plant_writer.flush()
 
     return jsonify(results)
 
+def stream_detect(images, batch_id, options):
+    """Yield one NDJSON line per finished image, then a final line with the deduplication outcome.
+
+    Only the plant candidates are kept across images, so memory stays flat no
+    matter how many files are uploaded. Duplicates are only known once every
+    image is in, so they are reported in the closing 'done' line.
+    """
+    started = time.perf_counter()
+    candidates = []
+    timings = []
+    processed = 0
+    error = None
+    saved = False
+    try:
+        with closing(survey_pipeline(((f.filename, f.read) for f in images), options)) as pipeline:
+            for image_name, entry, image_candidates, failure in pipeline:
+                if failure is not None:
+                    # Headers are already sent, so the failure goes into the stream; earlier plants are kept
+                    logger.error(f"Error processing {image_name}: {failure}")
+                    error = str(failure)
+                    yield json.dumps({'type': 'error', 'image_name': image_name, 'error': error}) + '\n'
+                    break
+                candidates.extend(image_candidates)
+                timings.append(entry['timings'])
+                processed += 1
+                yield json.dumps(dict(entry, type='image', index=processed - 1)) + '\n'
+
+        saved = True
+        duplicates = save_survey_plants(batch_id, candidates, options['dedup_distance'])
+        plant_writer.flush()
+        yield json.dumps({'type': 'done', 'batch_id': batch_id, 'images': processed,
+                          'duplicates': duplicates, 'error': error,
+                          'timings': dict(pipeline_totals(timings), wall_ms=elapsed_ms(started))}) + '\n'
+    finally:
+        if not saved:
+            # The client disconnected mid-stream: keep the plants of the images already processed
+            logger.warning(f"Stream for batch {batch_id} closed after {processed} images; saving their plants")
+            save_survey_plants(batch_id, candidates, options['dedup_distance'])
+
+# Asynchronous bulk upload jobs
+JOB_WORKERS = int(os.environ.get('FAW_JOB_WORKERS', 2))
+JOB_DIR = os.environ.get('FAW_JOB_DIR', os.path.join('uploads', 'jobs'))
+JOB_MAX_PENDING = int(os.environ.get('FAW_JOB_MAX_PENDING', 100))
+
+MARK_PLANTS_SAVED_SQL = "UPDATE jobs SET plants_saved = 1 WHERE id = ?"
+
+class JobManager:
+    """Run bulk /api/jobs uploads on a bounded pool of worker threads.
+
+    Uploaded images are written to disk and every job and image state change
+    is committed to corn_plants.db, so jobs that were queued or running when
+    the server stopped pick up at their first unfinished image on start-up.
+    Progress goes to the Socket.IO room job:<id>.
+    """
+
+    def __init__(self, path, workers, job_dir, max_pending):
+        self.path = path
+        self.job_dir = job_dir
+        self.max_pending = max_pending
+        self.queue = Queue()
+        self.lock = threading.Lock()
+        self.active = set()
+        self.threads = [threading.Thread(target=self._run, daemon=True) for _ in range(max(1, workers))]
+        for thread in self.threads:
+            thread.start()
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def resume(self):
+        """Queue the jobs a previous run left unfinished; returns how many."""
+        with closing(self.connect()) as conn:
+            rows = conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at").fetchall()
+        for row in rows:
+            self._enqueue(row['id'])
+        if rows:
+            logger.info(f"Resuming {len(rows)} unfinished jobs")
+        return len(rows)
+
+    def pending(self):
+        with self.lock:
+            return len(self.active)
+
+    def submit(self, files, options):
+        """Persist an upload as a queued job and return its id; raises Full when too many are pending."""
+        if self.pending() >= self.max_pending:
+            raise Full
+        job_id = uuid.uuid4().hex
+        folder = os.path.join(self.job_dir, job_id)
+        os.makedirs(folder, exist_ok=True)
+
+        images = []
+        for position, image_file in enumerate(files):
+            path = os.path.join(folder, f"{position:06d}")
+            image_file.save(path)
+            images.append((job_id, position, image_file.filename, path, 'pending'))
+
+        now = time.time()
+        with closing(self.connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO jobs (id, batch_id, status, options, total, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, int(now), json.dumps(options), len(images), now, now))
+            conn.executemany(
+                "INSERT INTO job_images (job_id, position, image_name, path, status) VALUES (?, ?, ?, ?, ?)",
+                images)
+        self._enqueue(job_id)
+        return job_id
+
+    def _enqueue(self, job_id):
+        with self.lock:
+            if job_id in self.active:
+                return
+            self.active.add(job_id)
+        self.queue.put(job_id)
+
+    def get(self, job_id, include_results=False):
+        """Return a job's state, or None if there is no such job."""
+        with closing(self.connect()) as conn:
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            state = self._state(job)
+            images = conn.execute(
+                "SELECT position, image_name, status, result, error FROM job_images "
+                "WHERE job_id = ? ORDER BY position", (job_id,)).fetchall()
+        state['images'] = []
+        for image in images:
+            entry = {'position': image['position'], 'image_name': image['image_name'],
+                     'status': image['status'], 'error': image['error']}
+            if include_results and image['result']:
+                entry['result'] = json.loads(image['result'])
+            state['images'].append(entry)
+        return state
+
+    @staticmethod
+    def _state(job):
+        return {
+            'job_id': job['id'],
+            'batch_id': job['batch_id'],
+            'status': job['status'],
+            'total': job['total'],
+            'processed': job['processed'],
+            'failed': job['failed'],
+            'duplicates': json.loads(job['duplicates']) if job['duplicates'] else [],
+            'error': job['error'],
+            'created_at': job['created_at'],
+            'updated_at': job['updated_at']
+        }
+
+    @staticmethod
+    def read(path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def _progress(self, conn, job_id, **extra):
+        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        socketio.emit('job_progress', dict(self._state(job), **extra), to=f"job:{job_id}")
+
+    def _run(self):
+        while True:
+            job_id = self.queue.get()
+            try:
+                self._process(job_id)
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {e}")
+                with closing(self.connect()) as conn, conn:
+                    conn.execute("UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                                 (str(e), time.time(), job_id))
+                    self._progress(conn, job_id)
+            finally:
+                with self.lock:
+                    self.active.discard(job_id)
+
+    def _process(self, job_id):
+        with closing(self.connect()) as conn:
+            with conn:
+                job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                conn.execute("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?",
+                             (time.time(), job_id))
+            options = json.loads(job['options'])
+            pending = conn.execute(
+                "SELECT position, image_name, path FROM job_images "
+                "WHERE job_id = ? AND status = 'pending' ORDER BY position", (job_id,)).fetchall()
+
+            uploads = ((image['image_name'], lambda path=image['path']: self.read(path)) for image in pending)
+            for image, (_, entry, candidates, error) in zip(pending, survey_pipeline(uploads, options)):
+                if error is not None:
+                    logger.error(f"Job {job_id} image {image['image_name']}: {error}")
+                    with conn:
+                        conn.execute(
+                            "UPDATE job_images SET status = 'failed', error = ? WHERE job_id = ? AND position = ?",
+                            (str(error), job_id, image['position']))
+                        conn.execute(
+                            "UPDATE jobs SET processed = processed + 1, failed = failed + 1, updated_at = ? "
+                            "WHERE id = ?", (time.time(), job_id))
+                    self._progress(conn, job_id, image_name=image['image_name'], image_status='failed')
+                    continue
+
+                for candidate in candidates:
+                    candidate.pop('detection')
+                with conn:
+                    conn.execute(
+                        "UPDATE job_images SET status = 'done', result = ?, candidates = ? "
+                        "WHERE job_id = ? AND position = ?",
+                        (json.dumps(entry), json.dumps(candidates), job_id, image['position']))
+                    conn.execute("UPDATE jobs SET processed = processed + 1, updated_at = ? WHERE id = ?",
+                                 (time.time(), job_id))
+                self._progress(conn, job_id, image_name=image['image_name'], image_status='done')
+
+            # Deduplicate across the whole job once every image is in, then store its plants
+            candidates = []
+            for row in conn.execute("SELECT candidates FROM job_images WHERE job_id = ? AND status = 'done'",
+                                    (job_id,)):
+                candidates.extend(dict(candidate, detection={}) for candidate in json.loads(row['candidates']))
+            if job['plants_saved']:
+                # Restarted after the plants were committed: only rebuild the duplicate list
+                deduplicate_plants(candidates, options['dedup_distance'])
+                duplicates = duplicate_detections(candidates)
+            else:
+                duplicates = save_survey_plants(job['batch_id'], candidates, options['dedup_distance'],
+                                                [(MARK_PLANTS_SAVED_SQL, [(job_id,)])])
+                plant_writer.flush()
+
+            failed = conn.execute("SELECT failed, total FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            status = 'failed' if failed['total'] and failed['failed'] == failed['total'] else 'completed'
+            with conn:
+                conn.execute("UPDATE jobs SET status = ?, duplicates = ?, updated_at = ? WHERE id = ?",
+                             (status, json.dumps(duplicates), time.time(), job_id))
+            self._progress(conn, job_id)
+        shutil.rmtree(os.path.join(self.job_dir, job_id), ignore_errors=True)
+
+    def stats(self):
+        return {'workers': len(self.threads), 'active_jobs': self.pending(), 'queued_jobs': self.queue.qsize()}
+
+job_manager = JobManager('corn_plants.db', JOB_WORKERS, JOB_DIR, JOB_MAX_PENDING)
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Queue a bulk upload and return at once; poll /api/jobs/<id> or subscribe over Socket.IO."""
+    if 'images' not in request.files:
+        return jsonify({'error': 'No images uploaded'}), 400
+
+    try:
+        options = survey_options(request.values)
+    except ValueError:
+        return jsonify({'error': 'Invalid detection parameters'}), 400
+
+    try:
+        job_id = job_manager.submit(request.files.getlist('images'), options)
+    except Full:
+        return jsonify({'error': 'Too many pending jobs, try again later'}), 503, {'Retry-After': '30'}
+    return jsonify({'job_id': job_id, 'status': 'queued', 'status_url': f"/api/jobs/{job_id}"}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job progress; ?results=1 adds each finished image's detections and annotated image."""
+    state = job_manager.get(job_id, include_results=request.args.get('results') in ('1', 'true'))
+    if state is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(state)
+
+@socketio.on('subscribe_job')
+def handle_subscribe_job(data):
+    """Join the job's progress room; the ack carries its current state."""
+    job_id = (data or {}).get('job_id')
+    state = job_manager.get(job_id) if job_id else None
+    if state is None:
+        return {'error': 'Job not found'}
+    join_room(f"job:{job_id}")
+    return state
+
+@socketio.on('unsubscribe_job')
+def handle_unsubscribe_job(data):
+    job_id = (data or {}).get('job_id')
+    if job_id:
+        leave_room(f"job:{job_id}")
+
+def send_rendition(content_hash, size):
+    if not re.fullmatch(r'[0-9a-f]{64}', content_hash):
+        return jsonify({'error': 'Invalid image id'}), 400
+    try:
+        path = image_store.rendition(content_hash, size)
+    except Exception as e:
+        logger.error(f"Error rendering {size} image {content_hash}: {e}")
+        return jsonify({'error': 'Could not render image'}), 500
+    if path is None:
+        return jsonify({'error': 'Image not found'}), 404
+    # conditional=True answers If-None-Match / If-Modified-Since with 304 and Range with 206
+    max_age = 31536000 if request.args.get('v') else 3600
+    return send_file(path, mimetype='image/jpeg', conditional=True, etag=True, max_age=max_age)
+
+@app.route('/api/images/<content_hash>/<size>', methods=['GET'])
+def image_rendition(content_hash, size):
+    """Serve an annotated rendition (thumb, medium or full) of an uploaded image."""
+    if size not in RENDITION_SIZES:
+        return jsonify({'error': f"Unknown size, expected one of {', '.join(RENDITION_SIZES)}"}), 404
+    return send_rendition(content_hash, size)
+
+@app.route('/api/annotated/<content_hash>', methods=['GET'])
+def annotated(content_hash):
+    """Serve an uploaded image with its latest detections drawn on, rendered once and then cached."""
+    return send_rendition(content_hash, 'full')
+
 @app.route('/api/summary', methods=['GET'])
 def summary():
     conn = sqlite3.connect('corn_plants.db')
     cursor = conn.cursor()
 
-    # Query for summary data grouped by batch_id
+    # Read the trigger-maintained per-batch counts
     cursor.execute('''
-    SELECT 
-        batch_id,
-        SUM(CASE WHEN status = 'INFESTED' THEN 1 ELSE 0 END) AS infested_count,
-        SUM(CASE WHEN status = 'NOT INFESTED' THEN 1 ELSE 0 END) AS not_infested_count,
-        COUNT(*) AS total
-    FROM corn_plants
-    GROUP BY batch_id
+    SELECT batch_key, infested_count, not_infested_count, total
+    FROM batch_summaries
+    ORDER BY batch_key
     ''')
     summary_data = cursor.fetchall()
 
     # Format the response
     summary = []
     for row in summary_data:
-        batch_id, infested_count, not_infested_count, total = row
+        batch_key, infested_count, not_infested_count, total = row
+        batch_id = batch_key or None  # 0 is the bucket for rows without a batch_id
         infested_percentage = (infested_count / total) * 100 if total > 0 else 0
         not_infested_percentage = (not_infested_count / total) * 100 if total > 0 else 0
         summary.append({
@@ -416,6 +2313,136 @@ def summary():
     conn.close()
     return jsonify(summary)
 
+PLANTS_DEFAULT_LIMIT = 5000
+PLANTS_MAX_LIMIT = 50000
+EARTH_RADIUS_M = 6371000
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters between two GPS points."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+@app.route('/api/plants', methods=['GET'])
+def plants():
+    """Return stored plants inside a map viewport (bbox) or within radius meters of lat/lon."""
+    try:
+        limit = max(1, min(int(request.args.get('limit', PLANTS_DEFAULT_LIMIT)), PLANTS_MAX_LIMIT))
+        center = None
+        if 'bbox' in request.args:
+            # Same order as Leaflet's LatLngBounds.toBBoxString(): west,south,east,north
+            min_lon, min_lat, max_lon, max_lat = (float(v) for v in request.args['bbox'].split(','))
+        elif all(key in request.args for key in ('lat', 'lon', 'radius')):
+            lat = float(request.args['lat'])
+            lon = float(request.args['lon'])
+            radius = float(request.args['radius'])
+            dlat = math.degrees(radius / EARTH_RADIUS_M)
+            dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+            min_lat, max_lat, min_lon, max_lon = lat - dlat, lat + dlat, lon - dlon, lon + dlon
+            center = (lat, lon, radius)
+        else:
+            return jsonify({'error': 'Provide bbox=west,south,east,north or lat, lon and radius'}), 400
+    except ValueError:
+        return jsonify({'error': 'Invalid query parameters'}), 400
+
+    conn = sqlite3.connect('corn_plants.db')
+    cursor = conn.cursor()
+    params = (min_lat, max_lat, min_lon, max_lon, min_lat, max_lat, min_lon, max_lon)
+    distance_filter = ''
+    if center is not None:
+        # Filter the circle before LIMIT, so the corners of the bounding square never use up the limit
+        conn.create_function('haversine_m', 4, haversine_m, deterministic=True)
+        distance_filter = 'AND haversine_m(?, ?, p.gps_lat, p.gps_lon) <= ?'
+        params += center
+    cursor.execute(f'''
+    SELECT p.id, p.batch_id, p.image_name, p.gps_lat, p.gps_lon, p.status, p.content_hash
+    FROM corn_plants_rtree AS r
+    JOIN corn_plants AS p ON p.id = r.id
+    WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ?
+      AND p.gps_lat BETWEEN ? AND ? AND p.gps_lon BETWEEN ? AND ?
+      {distance_filter}
+    LIMIT ?
+    ''', params + (limit + 1,))
+    rows = cursor.fetchall()
+
+    # Batches that re-uploaded an image link to its plants; look them up for the returned page only
+    linked = {}
+    hashes = list({row[6] for row in rows[:limit] if row[6] is not None})
+    for i in range(0, len(hashes), 500):
+        chunk = hashes[i:i + 500]
+        cursor.execute(f'''
+        SELECT content_hash, stored_batch_id, batch_id FROM image_batches
+        WHERE content_hash IN ({','.join('?' * len(chunk))})
+        ''', chunk)
+        for content_hash, stored_batch_id, batch_id in cursor.fetchall():
+            linked.setdefault((content_hash, stored_batch_id), []).append(batch_id)
+    conn.close()
+
+    return jsonify({
+        'count': min(len(rows), limit),
+        'truncated': len(rows) > limit,
+        'plants': [
+            # batch_ids adds the batches that re-uploaded the same image and link to this plant
+            {'id': plant_id, 'batch_id': batch_id, 'image_name': image_name,
+             'lat': lat, 'lon': lon, 'status': status,
+             'batch_ids': [batch_id] + linked.get((content_hash, batch_id), [])}
+            for plant_id, batch_id, image_name, lat, lon, status, content_hash in rows[:limit]
+        ]
+    })
+
+@app.route('/api/tiles/<int:z>/<int:x>/<int:y>', methods=['GET'])
+def tiles(z, x, y):
+    """Return plant count, infested ratio and cluster centroids for one map tile."""
+    if not TILE_MIN_ZOOM <= z <= TILE_MAX_ZOOM:
+        return jsonify({'error': f'Zoom must be between {TILE_MIN_ZOOM} and {TILE_MAX_ZOOM}; '
+                                 f'use /api/plants for individual plants'}), 404
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return jsonify({'error': 'Tile out of range'}), 404
+
+    with tile_cache_lock:
+        version = tiles_version
+        payload = tile_cache.get((z, x, y))
+        if payload is not None:
+            tile_cache.move_to_end((z, x, y))
+
+    etag = f'"tiles-{version}-{z}-{x}-{y}"'
+    if request.headers.get('If-None-Match') == etag:
+        return '', 304, {'ETag': etag}
+
+    if payload is None:
+        conn = sqlite3.connect('corn_plants.db')
+        rows = conn.execute('''
+        SELECT count, infested, sum_lat, sum_lon
+        FROM plant_tiles
+        WHERE z = ? AND x = ? AND y = ?
+        ''', (z, x, y)).fetchall()
+        conn.close()
+
+        count = sum(row[0] for row in rows)
+        infested = sum(row[1] for row in rows)
+        payload = {
+            'z': z, 'x': x, 'y': y,
+            'count': count,
+            'infested': infested,
+            'infested_ratio': round(infested / count, 4) if count else 0,
+            'clusters': [
+                {'lat': sum_lat / cell_count, 'lon': sum_lon / cell_count, 'count': cell_count,
+                 'infested_ratio': round(cell_infested / cell_count, 4)}
+                for cell_count, cell_infested, sum_lat, sum_lon in rows if cell_count > 0
+            ]
+        }
+        with tile_cache_lock:
+            if version == tiles_version:
+                tile_cache[(z, x, y)] = payload
+                if len(tile_cache) > TILE_CACHE_SIZE:
+                    tile_cache.popitem(last=False)
+
+    response = jsonify(payload)
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/api/delete_batch/<int:batch_id>', methods=['DELETE'])
 def delete_batch(batch_id):
     """Delete a batch of data based on batch_id."""
@@ -424,21 +2451,177 @@ def delete_batch(batch_id):
         cursor = conn.cursor()
 
         if batch_id == 0:  # Special case for rows with NULL batch_id
-            cursor.execute('DELETE FROM corn_plants WHERE batch_id IS NULL')
+            where, params = 'batch_id IS NULL', ()
         else:
-            cursor.execute('DELETE FROM corn_plants WHERE batch_id = ?', (batch_id,))
+            where, params = 'batch_id = ?', (batch_id,)
+        owner = batch_id or None
+
+        # Plants that later batches link to are handed to the earliest of them instead of deleted
+        heirs = cursor.execute('''
+        SELECT content_hash, MIN(batch_id) FROM image_batches
+        WHERE stored_batch_id IS ? AND batch_id != ?
+        GROUP BY content_hash
+        ''', (owner, batch_id)).fetchall()
+        for content_hash, heir in heirs:
+            # Drop the heir's own link before its plants move, so the summary triggers stay balanced
+            cursor.execute('DELETE FROM image_batches WHERE batch_id = ? AND content_hash = ?', (heir, content_hash))
+            cursor.execute(f'UPDATE corn_plants SET batch_id = ? WHERE {where} AND content_hash = ?',
+                           (heir,) + params + (content_hash,))
+            cursor.execute('UPDATE image_batches SET stored_batch_id = ? WHERE stored_batch_id IS ? AND content_hash = ?',
+                           (heir, owner, content_hash))
+
+        # Take the batch's plants out of the map tile aggregates in the same transaction
+        plants = cursor.execute(f'SELECT gps_lat, gps_lon, status FROM corn_plants WHERE {where}', params)
+        deltas = plant_tile_deltas(plants.fetchall(), sign=-1)
+        cursor.executemany(UPSERT_TILE_SQL, deltas)
+        # Only the cells just decremented can have emptied
+        cursor.executemany('''
+        DELETE FROM plant_tiles
+        WHERE z = ? AND x = ? AND y = ? AND cell_x = ? AND cell_y = ? AND count <= 0
+        ''', [delta[:5] for delta in deltas])
+        cursor.execute(f'DELETE FROM corn_plants WHERE {where}', params)
+        # The batch's own links go with it; links to its plants were moved above
+        cursor.execute('DELETE FROM image_batches WHERE batch_id = ?', (batch_id,))
 
         conn.commit()
         conn.close()
+        invalidate_tiles()
 
         return jsonify({'message': f'Batch {batch_id} deleted successfully.'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Deferred start-up: load the model off the request path and gate the endpoints that need it
+STARTUP_RETRY_AFTER = 5
+# Endpoints that need the model or the label font
+MODEL_ENDPOINTS = {'detect_faw', 'detect', 'create_job', 'image_rendition', 'annotated'}
+
+@contextmanager
+def startup_stage(name):
+    startup_state['stage'] = name
+    started = time.time()
+    yield
+    startup_state['timings'][name] = round(time.time() - started, 3)
+
+def load_models():
+    """Resolve the model, load it in the pool or in-process and warm it up, load the font, timing each stage."""
+    global model, model_path, MODEL_VERSION, inference_pool, inference_scheduler, font
+    try:
+        with startup_stage('resolve'):
+            # Export best.pt for the selected backend if no cached artifact matches its hash
+            model_path = resolve_model("best.pt", MODEL_BACKEND)
+            # Identifies the model in result cache keys, so new weights or another backend never reuse old results
+            MODEL_VERSION = f"{MODEL_BACKEND}-{weights_hash('best.pt')[:16]}"
+
+        if worker_pool is not None:
+            with startup_stage('pool'):
+                worker_pool.load(model_path)
+                # Raises when no worker could load the model, so start-up is reported as failed
+                worker_pool.wait_ready(worker_pool.timeout)
+                inference_pool = worker_pool
+
+        if inference_pool is None:
+            # With the pool the workers hold the only copies of the model
+            with startup_stage('model'):
+                loaded = load_model(model_path)
+            # One throwaway call so the first real request does not pay for lazy initialization
+            with startup_stage('warmup'):
+                loaded(np.zeros((640, 640, 3), np.uint8), imgsz=640, verbose=False)
+            model = loaded
+        with startup_stage('font'):
+            font = ImageFont.truetype("arialbd.ttf", 50)
+
+        inference_scheduler = InferenceScheduler(BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS,
+                                                 concurrency=INFERENCE_WORKERS if inference_pool else 1,
+                                                 imgsz=640, conf=0.5, iou=0.5)
+    except Exception as e:
+        logger.error(f"Error loading {MODEL_BACKEND} model during {startup_state['stage']}: {e}", exc_info=True)
+        startup_state.update(status='failed', error=str(e))
+        return
+
+    startup_state.update(status='ready', stage=None, ready_at=time.time())
+    model_ready.set()
+    logger.info(f"Model ready in {startup_state['ready_at'] - startup_state['started_at']:.2f}s "
+                f"({startup_state['timings']})")
+    job_manager.resume()
+
+@app.before_request
+def require_model():
+    if request.endpoint in MODEL_ENDPOINTS and not model_ready.is_set():
+        error = 'Model failed to load' if startup_state['status'] == 'failed' else 'Model is loading'
+        return (jsonify({'error': error, 'status': startup_state['status'], 'stage': startup_state['stage']}),
+                503, {'Retry-After': str(STARTUP_RETRY_AFTER)})
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return jsonify({'status': 'ok', 'uptime': round(time.time() - startup_state['started_at'], 3)})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: 200 once the model can serve, 503 with the current load stage until then."""
+    state = dict(startup_state, timings=dict(startup_state['timings']))
+    if model_ready.is_set():
+        state['load_seconds'] = round(state['ready_at'] - state['started_at'], 3)
+        return jsonify(state)
+    return jsonify(state), 503, {'Retry-After': str(STARTUP_RETRY_AFTER)}
+
+@app.route('/status', methods=['GET'])
+def status():
+    """Cheap reachability probe built from in-memory state only.
+
+    The ETag covers the whole body and nothing time-based is included, so an
+    idle server answers a polling client's If-None-Match with an empty 304.
+    """
+    with counts_lock:
+        counts = dict(detection_counts)
+    response = jsonify({
+        'server': 'ok',
+        'model': {'status': startup_state['status'], 'backend': MODEL_BACKEND, 'ready': model_ready.is_set()},
+        'queues': {
+            'inference': inference_scheduler.queue.qsize() if inference_scheduler else 0,
+            'jobs': job_manager.pending(),
+            'db_writes': detection_writer.queue.qsize() + plant_writer.queue.qsize()
+        },
+        'stream_clients': frame_broadcaster.has_clients(),
+        'counts': counts
+    })
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+# Queue depths are read when /metrics is scraped
+metrics.track_queue('inference', lambda: inference_scheduler.queue.qsize() if inference_scheduler else 0)
+metrics.track_queue('db_detections', detection_writer.queue.qsize)
+metrics.track_queue('db_corn_plants', plant_writer.queue.qsize)
+metrics.track_queue('jobs', job_manager.pending)
+metrics.track_queue('stream_frames', lambda: len(frame_broadcaster.pending))
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    # Streamed bodies are timed up to the first byte, not until the last line is sent
+    endpoint = request.endpoint or 'unmatched'
+    metrics.REQUESTS.labels(endpoint, request.method, response.status_code).inc()
+    started = g.get('request_started')
+    if started is not None:
+        metrics.REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - started)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
+threading.Thread(target=load_models, name='model-loader', daemon=True).start()
+
 if __name__ == '__main__':
     try:
         # Start frame streaming thread
-        threading.Thread(target=stream_frames, daemon=True).start()
+        threading.Thread(target=frame_broadcaster.run, daemon=True).start()
         
         logger.info("Starting server on http://0.0.0.0:5000")
         socketio.run(app, 
@@ -450,5 +2633,3 @@ if __name__ == '__main__':
     
     except Exception as e:
         logger.error(f"Server error: {e}")
-
-    init_db()
@@ -13,9 +13,13 @@ function Home() {
   const canvasRef = useRef(null);
   const videoCaptureRef = useRef(null);
   const iframeRef = useRef(null);
-  const trackedObjectsRef = useRef([]);
-  const nextObjectId = useRef(1); // Use useRef to persist the ID counter
-  const infestedPlantIdsRef = useRef(new Set()); // Stores IDs of plants ever marked as infested
+  const trackedObjectsRef = useRef([]); // Latest boxes with the server's track IDs
+  // Per-tab source id, so tabs on the same host get their own tracker and scene cache on the server
+  const sourceIdRef = useRef(
+    window.crypto && window.crypto.randomUUID
+      ? window.crypto.randomUUID()
+      : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`
+  );
 
   const statusText = isServerReachable && isScreenCaptured
     ? 'Connected ✅'
@@ -24,11 +28,8 @@ function Home() {
   useEffect(() => {
     const checkServer = async () => {
       try {
-        const response = await fetch('http://localhost:5000/detect', {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/octet-stream' },
-          body: new Blob([]),
-        });
+        // no-cache revalidates with If-None-Match, so an unchanged status costs an empty 304
+        const response = await fetch('http://localhost:5000/status', { cache: 'no-cache' });
         setIsServerReachable(response.ok);
       } catch {
         setIsServerReachable(false);
@@ -109,16 +110,20 @@ function Home() {
           try {
             const response = await fetch('http://localhost:5000/detect', {
               method: 'POST',
-              headers: { 'Content-Type': 'application/octet-stream' },
+              headers: {
+                'Content-Type': 'application/octet-stream',
+                'X-Source-Id': sourceIdRef.current,
+              },
               body: blob,
             });
             const result = await response.json();
-            const newDetections = (result.boxes || []).map((box, index) => ({
+            // The server tracks plants across frames, so IDs and counts come back ready to show
+            trackedObjectsRef.current = (result.boxes || []).map((box, index) => ({
+              id: (result.track_ids || [])[index],
               box: box,
               class: (result.classes || [])[index],
             }));
-            updateTrackedObjects(newDetections); // Update tracked objects
-            updateCounts(); // Update counts based on tracked objects
+            updateCounts(result);
             setIsServerReachable(true);
           } catch (err) {
             setIsServerReachable(false);
@@ -131,89 +136,6 @@ function Home() {
     return () => clearInterval(intervalId);
   }, []);
 
-  // Function to calculate Intersection over Union (IoU)
-  const iou = (boxA, boxB) => {
-    const [xA, yA, wA, hA] = boxA;
-    const [xB, yB, wB, hB] = boxB;
-
-    const xA1 = xA - wA / 2, yA1 = yA - hA / 2;
-    const xA2 = xA + wA / 2, yA2 = yA + hA / 2;
-    const xB1 = xB - wB / 2, yB1 = yB - hB / 2;
-    const xB2 = xB + wB / 2, yB2 = yB + hB / 2;
-
-    const interX1 = Math.max(xA1, xB1);
-    const interY1 = Math.max(yA1, yB1);
-    const interX2 = Math.min(xA2, xB2);
-    const interY2 = Math.min(yA2, yB2);
-
-    const interArea = Math.max(0, interX2 - interX1) * Math.max(0, interY2 - interY1);
-    const boxAArea = (xA2 - xA1) * (yA2 - yA1);
-    const boxBArea = (xB2 - xB1) * (yB2 - yB1);
-
-    const unionArea = boxAArea + boxBArea - interArea;
-    return unionArea > 0 ? interArea / unionArea : 0; // Avoid division by zero
-  };
-
-  // Function to update tracked objects
-  const updateTrackedObjects = (newDetections) => {
-    const now = Date.now();
-    const updatedTrackedObjects = [];
-    const matchedIndices = new Set();
-
-    // Try to match new detections with existing tracked objects
-    newDetections.forEach((detection) => {
-      let bestMatch = null;
-      let highestIou = 0.4; // IoU threshold (Increased from 0.3)
-
-      trackedObjectsRef.current.forEach((obj, index) => {
-        if (!matchedIndices.has(index)) { // Only consider unmatched tracked objects
-          const iouValue = iou(obj.box, detection.box);
-          if (iouValue > highestIou) {
-            highestIou = iouValue;
-            bestMatch = { ...obj, index }; // Store index to mark as matched
-          }
-        }
-      });
-
-      if (bestMatch) {
-        // Update the matched object
-        bestMatch.box = detection.box;
-        bestMatch.timestamp = now;
-        bestMatch.class = detection.class; // Update class
-        updatedTrackedObjects.push(bestMatch);
-        matchedIndices.add(bestMatch.index); // Mark this tracked object index as matched
-        // Add to cumulative infested set if it's infested
-        if (bestMatch.class === 0) {
-          infestedPlantIdsRef.current.add(bestMatch.id);
-        }
-      } else {
-        // Assign a new ID and add as a new object
-        const newObj = {
-          id: nextObjectId.current++,
-          box: detection.box,
-          timestamp: now,
-          class: detection.class,
-        };
-        updatedTrackedObjects.push(newObj);
-        // Add to cumulative infested set if it's infested
-        if (newObj.class === 0) {
-          infestedPlantIdsRef.current.add(newObj.id);
-        }
-      }
-    });
-
-    // Add back any existing tracked objects that weren't matched but are not stale
-    trackedObjectsRef.current.forEach((obj, index) => {
-      // Keep objects that weren't matched if they are not stale (Increased timeout to 10s)
-      if (!matchedIndices.has(index) && now - obj.timestamp < 1000) {
-        updatedTrackedObjects.push(obj);
-      }
-    });
-
-    // Update the ref with the new list of tracked objects
-    trackedObjectsRef.current = updatedTrackedObjects;
-  };
-
   // Updated drawBoxes function to use tracked objects and show IDs
   const drawBoxes = (ctx) => {
     const trackedObjects = trackedObjectsRef.current;
@@ -257,10 +179,10 @@ function Home() {
     });
   };
 
-  // Updated updateCounts function for cumulative total and cumulative infested
-  const updateCounts = () => {
-    const cumulativeTotalCount = nextObjectId.current - 1; // Total unique plants ever detected
-    const cumulativeInfestedCount = infestedPlantIdsRef.current.size;
+  // Counts are unique tracked plants since the last reset, shared by every client
+  const updateCounts = (result) => {
+    const cumulativeInfestedCount = result.infested_count || 0;
+    const cumulativeTotalCount = cumulativeInfestedCount + (result.not_infested_count || 0);
   
     setTotalCorn(cumulativeTotalCount);
     setInfestedCorn(cumulativeInfestedCount);
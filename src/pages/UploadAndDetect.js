@@ -1,6 +1,6 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
 import { useDropzone } from 'react-dropzone';
-import { MapContainer, TileLayer, Marker, Popup, useMap } from 'react-leaflet';
+import { MapContainer, TileLayer, Marker, Popup, CircleMarker, useMap, useMapEvents } from 'react-leaflet';
 import L from 'leaflet';
 import 'leaflet/dist/leaflet.css';
 import './UploadAndDetect.css';
@@ -42,6 +42,108 @@ function FlyToMarker({ position }) {
   return null;
 }
 
+const API_URL = 'http://localhost:5000';
+
+// Below this zoom the map shows server-side cluster aggregates instead of individual plants
+const CLUSTER_MAX_ZOOM = 18;
+
+// Fetch the aggregate tiles covering the current view and flatten their clusters
+const fetchClusters = async (map) => {
+  const z = Math.round(map.getZoom());
+  const bounds = map.getBounds();
+  const nw = map.project(bounds.getNorthWest(), z).divideBy(256).floor();
+  const se = map.project(bounds.getSouthEast(), z).divideBy(256).floor();
+  const requests = [];
+  for (let x = nw.x; x <= se.x; x++) {
+    for (let y = nw.y; y <= se.y; y++) {
+      requests.push(
+        fetch(`${API_URL}/api/tiles/${z}/${x}/${y}`).then((response) => (response.ok ? response.json() : null))
+      );
+    }
+  }
+  const tiles = await Promise.all(requests);
+  return tiles.filter(Boolean).flatMap((tile) => tile.clusters);
+};
+
+// Show stored plants inside the current view: clusters when zoomed out, individual plants when zoomed in
+function ViewportPlants() {
+  const [plants, setPlants] = useState([]);
+  const [clusters, setClusters] = useState([]);
+
+  const loadPlants = useCallback(async (map) => {
+    try {
+      if (map.getZoom() < CLUSTER_MAX_ZOOM) {
+        setClusters(await fetchClusters(map));
+        setPlants([]);
+        return;
+      }
+      const response = await fetch(`${API_URL}/api/plants?bbox=${map.getBounds().toBBoxString()}`);
+      const data = await response.json();
+      setPlants(data.plants || []);
+      setClusters([]);
+    } catch (error) {
+      console.error('Error fetching plants:', error);
+    }
+  }, []);
+
+  const map = useMapEvents({
+    moveend: () => loadPlants(map),
+  });
+
+  useEffect(() => {
+    loadPlants(map);
+  }, [map, loadPlants]);
+
+  return (
+    <>
+      {clusters.map((cluster, idx) => (
+        <CircleMarker
+          key={`cluster-${idx}`}
+          center={[cluster.lat, cluster.lon]}
+          radius={Math.min(30, 4 + Math.sqrt(cluster.count))}
+          pathOptions={{ color: cluster.infested_ratio > 0.5 ? 'red' : 'green' }}
+        >
+          <Popup>
+            {cluster.count} plants, {(cluster.infested_ratio * 100).toFixed(1)}% infested
+          </Popup>
+        </CircleMarker>
+      ))}
+      {plants.map((plant) => (
+        <CircleMarker
+          key={plant.id}
+          center={[plant.lat, plant.lon]}
+          radius={5}
+          pathOptions={{ color: plant.status === 'INFESTED' ? 'red' : 'green' }}
+        >
+          <Popup>
+            {plant.status === 'INFESTED' ? 'Infested Corn Plant' : 'Not Infested Corn Plant'} ({plant.image_name})
+          </Popup>
+        </CircleMarker>
+      ))}
+    </>
+  );
+}
+
+// Call onMessage for every JSON line of a streamed response as soon as it arrives
+const readNdjson = async (response, onMessage) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffered += decoder.decode(value || new Uint8Array(), { stream: !done });
+    const lines = buffered.split('\n');
+    buffered = lines.pop();
+    lines.filter((line) => line.trim()).forEach((line) => onMessage(JSON.parse(line)));
+    if (done) {
+      break;
+    }
+  }
+  if (buffered.trim()) {
+    onMessage(JSON.parse(buffered));
+  }
+};
+
 function UploadAndDetect() {
   const [results, setResults] = useState([]);
   const [mapData, setMapData] = useState([]);
@@ -50,6 +152,27 @@ function UploadAndDetect() {
   const [summary, setSummary] = useState([]); // For summary table
   const [loading, setLoading] = useState(false); // Loading state
 
+  // Flag detections the server merged into a plant already seen in another image
+  const markDuplicates = (duplicates) => {
+    if (!duplicates || !duplicates.length) {
+      return;
+    }
+    setResults((previous) =>
+      previous.map((item) => {
+        const indexes = duplicates.filter((d) => d.image_name === item.image_name).map((d) => d.detection);
+        if (!indexes.length) {
+          return item;
+        }
+        return {
+          ...item,
+          detections: item.detections.map((detection, idx) =>
+            indexes.includes(idx) ? { ...detection, duplicate: true } : detection
+          ),
+        };
+      })
+    );
+  };
+
   const { getRootProps, getInputProps } = useDropzone({
     accept: 'image/*',
     multiple: true,
@@ -58,8 +181,11 @@ function UploadAndDetect() {
       acceptedFiles.forEach((file) => formData.append('images', file));
 
       setLoading(true);
+      setResults([]);
+      setMapData([]);
       try {
-        const response = await fetch('http://localhost:5000/api/detect', {
+        // Results stream back as one NDJSON line per image, so the gallery fills in as they finish
+        const response = await fetch(`${API_URL}/api/detect?stream=1`, {
           method: 'POST',
           body: formData,
         });
@@ -68,20 +194,24 @@ function UploadAndDetect() {
           throw new Error(`HTTP error! status: ${response.status}`);
         }
 
-        const data = await response.json();
-        setResults(data);
-
-        const gpsPoints = data
-          .filter((item) => item.gps.lat && item.gps.lon)
-          .map((item) => {
-            const isInfested = item.detections.some((detection) => detection.status === 'INFESTED');
-            return {
-              lat: item.gps.lat,
-              lng: item.gps.lon,
-              infested: isInfested,
-            };
-          });
-        setMapData(gpsPoints);
+        let streamError = null;
+        await readNdjson(response, (message) => {
+          if (message.type === 'image') {
+            setResults((previous) => [...previous, message]);
+            if (message.gps.lat && message.gps.lon) {
+              const isInfested = message.detections.some((detection) => detection.status === 'INFESTED');
+              setMapData((previous) => [...previous, { lat: message.gps.lat, lng: message.gps.lon, infested: isInfested }]);
+            }
+          } else if (message.type === 'error') {
+            streamError = message.error;
+          } else if (message.type === 'done') {
+            markDuplicates(message.duplicates);
+          }
+        });
+
+        if (streamError) {
+          throw new Error(streamError);
+        }
       } catch (error) {
         console.error('Error:', error);
         alert('Failed to process images. Please try again.');
@@ -94,7 +224,7 @@ function UploadAndDetect() {
 
   const fetchSummary = async () => {
     try {
-      const response = await fetch('http://localhost:5000/api/summary');
+      const response = await fetch(`${API_URL}/api/summary`);
       const data = await response.json();
       setSummary(data);
     } catch (error) {
@@ -104,7 +234,7 @@ function UploadAndDetect() {
 
   const deleteBatch = async (batchId) => {
     try {
-      const response = await fetch(`http://localhost:5000/api/delete_batch/${batchId || 0}`, {
+      const response = await fetch(`${API_URL}/api/delete_batch/${batchId || 0}`, {
         method: 'DELETE',
       });
 
@@ -136,25 +266,29 @@ function UploadAndDetect() {
         <p>Drag and drop images here, or click to select files</p>
       </div>
 
-      {loading && (
+      {loading && results.length === 0 && (
         <div className="loading-overlay">
           <div className="spinner"></div>
           <p>Processing images, please wait...</p>
         </div>
       )}
 
+      {loading && results.length > 0 && <p>Processed {results.length} images so far...</p>}
+
       {results.length > 0 && (
         <div className="image-gallery">
           {results.map((result, idx) => (
-            <div key={idx} className="image-item" onClick={() => setSelectedImage(result.image)}>
+            <div key={idx} className="image-item" onClick={() => setSelectedImage(`${API_URL}${result.images.full}`)}>
               <h4>Image {idx + 1}</h4>
               <img
-                src={`data:image/jpeg;base64,${result.image}`}
+                src={`${API_URL}${result.images.thumb}`}
                 alt={`Processed ${idx + 1}`}
+                loading="lazy"
               />
               {result.detections.map((detection, i) => (
                 <p key={i}>
                   Status: {detection.status}, Confidence: {detection.confidence.toFixed(2)}%
+                  {detection.duplicate && ' (already counted in another image)'}
                 </p>
               ))}
               {result.gps.lat && result.gps.lon && (
@@ -168,7 +302,7 @@ function UploadAndDetect() {
       {selectedImage && (
         <div className="modal" onClick={() => setSelectedImage(null)}>
           <div className="modal-content" onClick={(e) => e.stopPropagation()}>
-            <img src={`data:image/jpeg;base64,${selectedImage}`} alt="Full Screen" />
+            <img src={selectedImage} alt="Full Screen" />
           </div>
         </div>
       )}
@@ -198,6 +332,7 @@ function UploadAndDetect() {
                 </Popup>
               </Marker>
             ))}
+            <ViewportPlants />
             {selectedPosition && <FlyToMarker position={selectedPosition} />}
           </MapContainer>
         </div>
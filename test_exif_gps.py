@@ -0,0 +1,77 @@
+"""Regression tests for the header-only EXIF reader: broken headers give an empty dict."""
+import struct
+
+import pytest
+
+from exif_gps import read_exif
+
+
+def entry(tag, kind, count, value):
+    return struct.pack('<HHI', tag, kind, count) + value
+
+
+def ifd(entries, next_offset=0):
+    return struct.pack('<H', len(entries)) + b''.join(entries) + struct.pack('<I', next_offset)
+
+
+def jpeg(tiff):
+    payload = b'Exif\x00\x00' + tiff
+    return b'\xff\xd8\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload + b'\xff\xd9'
+
+
+def rational(values):
+    return b''.join(struct.pack('<II', round(v * 1000), 1000) for v in values)
+
+
+def gps_tiff(latitude=None, altitude=None):
+    """IFD0 at 8 pointing to a GPS IFD at 26, with value data after it."""
+    latitude = rational((52, 30, 15.5)) if latitude is None else latitude
+    altitude = rational((120.5,)) if altitude is None else altitude
+    gps_offset = 26
+    data_offset = gps_offset + 2 + 5 * 12 + 4
+    gps = ifd([
+        entry(0x01, 2, 2, b'N\x00\x00\x00'),
+        entry(0x02, 5, len(latitude) // 8, struct.pack('<I', data_offset)),
+        entry(0x03, 2, 2, b'W\x00\x00\x00'),
+        entry(0x04, 5, 3, struct.pack('<I', data_offset + len(latitude))),
+        entry(0x06, 5, len(altitude) // 8, struct.pack('<I', data_offset + 2 * len(latitude))),
+    ])
+    ifd0 = ifd([entry(0x8825, 4, 1, struct.pack('<I', gps_offset))])
+    return b'II*\x00' + struct.pack('<I', 8) + ifd0 + gps + latitude + latitude + altitude
+
+
+def test_reads_gps():
+    info = read_exif(jpeg(gps_tiff()))
+    assert info['lat'] == pytest.approx(52 + 30 / 60 + 15.5 / 3600)
+    assert info['lon'] == pytest.approx(-(52 + 30 / 60 + 15.5 / 3600))
+    assert info['altitude'] == pytest.approx(120.5)
+
+
+@pytest.mark.parametrize('cut', [4, 10, 30, 60, 100])
+def test_truncated_header(cut):
+    assert isinstance(read_exif(jpeg(gps_tiff()[:cut])), dict)
+
+
+def test_huge_count_is_rejected_without_allocating():
+    # One SHORT entry claiming 2**30 values must be refused before any format string is built
+    tiff = b'II*\x00' + struct.pack('<I', 8) + ifd([entry(0x0112, 3, 0x40000000, struct.pack('<I', 8))])
+    assert read_exif(jpeg(tiff)) == {}
+
+
+def test_multi_valued_ifd_offset():
+    tiff = b'II*\x00' + struct.pack('<I', 8) + ifd([entry(0x8825, 3, 2, struct.pack('<HH', 8, 8))])
+    assert read_exif(jpeg(tiff)) == {}
+
+
+def test_wrong_field_types():
+    # Two-value latitude and altitude, and a DateTime stored as a SHORT
+    info = read_exif(jpeg(gps_tiff(latitude=rational((52, 30)), altitude=rational((1, 2)))))
+    assert 'lat' not in info and 'altitude' not in info
+
+    tiff = b'II*\x00' + struct.pack('<I', 8) + ifd([entry(0x0132, 3, 1, struct.pack('<HH', 7, 0))])
+    assert read_exif(jpeg(tiff)) == {}
+
+
+def test_not_a_jpeg():
+    assert read_exif(b'\x89PNG\r\n\x1a\n') == {}
+    assert read_exif(b'') == {}